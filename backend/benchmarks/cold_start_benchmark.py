@@ -0,0 +1,193 @@
+"""
+Time-to-first-query on a cold process: Chroma vs ExactStore vs a snapshot bundle.
+
+Builds a synthetic corpus into a temporary directory as per-domain Chroma
+partitions and per-domain ExactStore partitions, exports the ExactStore into
+a snapshot bundle, then starts a fresh Python process per layout that opens
+the store and answers queries for domains it has not touched yet. Before
+each run the store files are evicted from the page cache (posix_fadvise,
+best effort; --warm skips it) so reads come from disk the way they do on a
+new Cloud Run instance.
+
+Reported per layout:
+    import s     importing the store modules
+    open ms      opening the store (client, registry or manifest)
+    first ms     the first query
+    first-N ms   the first --first queries, each on a new domain
+    process s    spawn to first answer, interpreter start included
+    RSS MB       resident memory after the first-N queries
+
+Run from the repository root:
+    python -m backend.benchmarks.cold_start_benchmark [--domains 300] [--first 20] [--runs 3]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from backend.benchmarks.vector_search_benchmark import K, make_corpus, make_queries, rss_mb
+
+LAYOUTS = ("chroma", "exact", "snapshot")
+
+
+def build(root, corpus):
+    import chromadb
+    from backend.src.tools.exact_store import ExactStore
+    from backend.src.tools.partitions import partition_name
+    from backend.src.tools.vector_snapshot import export
+
+    client = chromadb.PersistentClient(path=os.path.join(root, "chroma"))
+    store = ExactStore()
+    store.root = lambda vectordb_name="vectorDB": os.path.join(root, "exact", vectordb_name)
+    for domain, (ids, documents, vectors) in corpus.items():
+        name = partition_name(domain, mode="domain")
+        metadatas = [{"domain": domain, "source": domain} for _ in ids]
+        client.get_or_create_collection(name).add(ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors)
+        store.collection(name, "vectorDB").upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors)
+    client.clear_system_cache()
+    export(store, os.path.join(root, "snapshot", "vectorDB"))
+
+
+def evict(path):
+    """Drop the files under `path` from the page cache; returns whether it was possible."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    for directory, _, names in os.walk(path):
+        for name in names:
+            fd = os.open(os.path.join(directory, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+    return True
+
+
+def run_layout(layout, root, first):
+    """Runs in a fresh subprocess; prints one JSON line of timings."""
+    data = np.load(os.path.join(root, "queries.npz"), allow_pickle=True)
+    domains, vectors = list(data["domains"]), data["vectors"]
+
+    started = time.perf_counter()
+    from backend.src.tools.partitions import partition_name
+    if layout == "chroma":
+        import chromadb
+    else:
+        from backend.src.tools.exact_store import exact_store
+        from backend.src.tools.vector_snapshot import vector_snapshot
+    imported = time.perf_counter()
+
+    if layout == "chroma":
+        client = chromadb.PersistentClient(path=os.path.join(root, "chroma"))
+
+        def search(domain, vector):
+            collection = client.get_collection(partition_name(domain, mode="domain"))
+            return collection.query(query_embeddings=[vector], n_results=K)["ids"][0]
+    else:
+        # Local partitions: the built ExactStore, or an empty delta layer under the snapshot
+        local = "exact" if layout == "exact" else "delta"
+        exact_store.root = lambda vectordb_name="vectorDB": os.path.join(root, local, vectordb_name)
+        if layout == "snapshot":
+            vector_snapshot.root = os.path.join(root, "snapshot")
+            vector_snapshot.attach("vectorDB")
+
+        def search(domain, vector):
+            partition = exact_store.collection(partition_name(domain, mode="domain"), "vectorDB", create=False)
+            return [doc.id for doc, _ in partition.search(vector, k=K)]
+    opened = time.perf_counter()
+
+    answers = [search(domains[0], vectors[0])]
+    first_done = time.perf_counter()
+    first_wall = time.time()
+    for domain, vector in list(zip(domains, vectors))[1:first]:
+        answers.append(search(domain, vector))
+    done = time.perf_counter()
+
+    print(json.dumps({
+        "layout": layout,
+        "import_s": imported - started,
+        "open_ms": (opened - imported) * 1000,
+        "first_ms": (first_done - opened) * 1000,
+        "first_n_ms": (done - opened) * 1000,
+        "first_wall": first_wall,
+        "rss_mb": rss_mb(),
+        "answers": answers,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domains", type=int, default=300)
+    parser.add_argument("--first", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--warm", action="store_true")
+    parser.add_argument("--layout", choices=LAYOUTS)
+    parser.add_argument("--root")
+    args = parser.parse_args()
+
+    if args.layout:
+        run_layout(args.layout, args.root, args.first)
+        return
+
+    root = tempfile.mkdtemp(prefix="cold_start_bench_")
+    try:
+        corpus = make_corpus(args.domains)
+        # One query per domain, so every query in a run opens a partition for the first time
+        queries, seen = [], set()
+        for domain, vector in make_queries(corpus, args.domains * 10):
+            if domain not in seen:
+                seen.add(domain)
+                queries.append((domain, vector))
+        build(root, corpus)
+        np.savez(
+            os.path.join(root, "queries.npz"),
+            domains=np.array([d for d, _ in queries], dtype=object),
+            vectors=np.stack([v for _, v in queries]),
+        )
+        truth = []
+        for domain, vector in queries[:args.first]:
+            ids, _, vectors = corpus[domain]
+            truth.append([ids[i] for i in np.argsort(-(vectors @ vector))[:K]])
+
+        evicted = True
+        print(f"\n{'layout':<10}{'import s':>10}{'open ms':>10}{'first ms':>10}{f'first-{args.first} ms':>14}"
+              f"{'process s':>11}{'RSS MB':>8}{'recall':>8}")
+        for layout in LAYOUTS:
+            results = []
+            for _ in range(args.runs):
+                if not args.warm:
+                    evicted = evict(root) and evicted
+                spawned = time.time()
+                output = subprocess.run(
+                    [sys.executable, "-m", "backend.benchmarks.cold_start_benchmark",
+                     "--layout", layout, "--root", root, "--first", str(args.first)],
+                    capture_output=True, text=True, check=True,
+                    env={**os.environ, "VECTOR_BACKEND": "exact" if layout != "chroma" else "chroma"},
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                result["process_s"] = result["first_wall"] - spawned
+                results.append(result)
+
+            def median(key):
+                return statistics.median(r[key] for r in results)
+
+            answers = results[0]["answers"]
+            hits = sum(len(set(a) & set(t)) for a, t in zip(answers, truth))
+            print(f"{layout:<10}{median('import_s'):>10.2f}{median('open_ms'):>10.1f}{median('first_ms'):>10.1f}"
+                  f"{median('first_n_ms'):>14.1f}{median('process_s'):>11.2f}{median('rss_mb'):>8.0f}"
+                  f"{hits / (K * len(truth)):>8.3f}")
+        if not args.warm and not evicted:
+            print("⚠️ Could not evict the page cache here; timings are warm")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Compare the HTML-to-text engines on the fixture pages.
+
+Checks that every engine produces the same text as the reference
+BeautifulSoup/html.parser engine, times each engine on the fixtures and on
+multi-megabyte copies of them, and measures how long the event loop stalls
+when a large page is extracted inline versus in the process pool.
+
+Run from the repository root:
+    python -m backend.benchmarks.extraction_benchmark
+"""
+import asyncio
+import glob
+import os
+import statistics
+import time
+
+from backend.src.tools import text_extraction
+from backend.src.tools.text_extraction import ENGINES, extract_main_text, extract_main_text_async
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "html")
+REFERENCE_ENGINE = "bs4"
+LARGE_TARGET_BYTES = 3_000_000
+RUNS = 3
+
+
+def load_fixtures():
+    fixtures = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            fixtures[os.path.basename(path)] = f.read()
+    return fixtures
+
+
+def enlarge(html: str, target_bytes=LARGE_TARGET_BYTES) -> str:
+    """Repeat the body contents until the page is roughly `target_bytes` long."""
+    start = html.index("<body>") + len("<body>")
+    end = html.index("</body>")
+    body = html[start:end]
+    copies = max(1, target_bytes // max(1, len(body)))
+    return html[:start] + body * copies + html[end:]
+
+
+def time_engine(engine, html, runs=RUNS):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        ENGINES[engine](html)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+async def max_loop_stall(coro_factory, tick=0.005):
+    """Longest gap between ticks of a heartbeat task while the coroutine runs."""
+    worst = 0.0
+    running = True
+
+    async def heartbeat():
+        nonlocal worst
+        last = time.perf_counter()
+        while running:
+            await asyncio.sleep(tick)
+            now = time.perf_counter()
+            worst = max(worst, now - last - tick)
+            last = now
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(tick * 2)
+    await coro_factory()
+    running = False
+    await beat
+    return worst
+
+
+async def loop_stall_report(html):
+    async def inline():
+        extract_main_text(html)
+
+    async def pooled():
+        await extract_main_text_async(html)
+
+    # Warm the pool so process start-up is not counted
+    await extract_main_text_async(html)
+    return {
+        "inline": await max_loop_stall(inline),
+        "process_pool": await max_loop_stall(pooled),
+    }
+
+
+def main():
+    fixtures = load_fixtures()
+    cases = dict(fixtures)
+    for name, html in fixtures.items():
+        cases[f"{name} (x{LARGE_TARGET_BYTES // 1_000_000}MB)"] = enlarge(html)
+
+    print(f"{'fixture':45} {'engine':10} {'equal':6} {'median ms':>10} {'speedup':>8}")
+    for name, html in cases.items():
+        reference = ENGINES[REFERENCE_ENGINE](html)
+        reference_time = time_engine(REFERENCE_ENGINE, html)
+        for engine in ENGINES:
+            output = ENGINES[engine](html)
+            elapsed = reference_time if engine == REFERENCE_ENGINE else time_engine(engine, html)
+            print(f"{name:45} {engine:10} {str(output == reference):6} "
+                  f"{elapsed * 1000:10.1f} {reference_time / elapsed:7.1f}x")
+
+    large = enlarge(next(iter(fixtures.values())))
+    stalls = asyncio.run(loop_stall_report(large))
+    print(f"\nEvent-loop stall on a {len(large) / 1e6:.1f}MB page "
+          f"({text_extraction.EXTRACTION_ENGINE} engine):")
+    for mode, stall in stalls.items():
+        print(f"  {mode:13} {stall * 1000:8.1f} ms")
+    text_extraction.shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Calibrate the tiered grader's accept/reject thresholds offline.
+
+Embeds a labelled fixture set of (query, chunk, relevant) pairs with the
+configured embedding model, computes the first-tier cheap score of every
+pair (cosine similarity blended with query-term overlap) and, for each
+candidate lexical weight, finds the widest band the cheap tier may decide:
+the lowest accept score and the highest reject score whose decisions agree
+with the labels at least --precision of the time. Everything between the
+two goes to the LLM judge.
+
+Labels come from the fixture file. With --llm-labels the LLM judge labels
+the pairs instead (composite score >= --relevant-score), which calibrates
+the cascade to reproduce the judge it stands in for.
+
+Run from the repository root:
+    python -m backend.benchmarks.grader_calibration [--fixtures pairs.jsonl] [--precision 0.95] [--llm-labels]
+"""
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+
+from backend.src.tools.lexical_index import tokenize
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "grader_calibration.jsonl")
+LEXICAL_WEIGHTS = (0.0, 0.15, 0.3, 0.5)
+
+
+def load_fixtures(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def similarities(pairs):
+    """Cosine similarity of every pair, embedding each query and chunk once."""
+    from backend.src.tools.embeddings import get_embedding_function
+    from backend.src.tools.quantization import normalize_rows
+
+    embedding_function = get_embedding_function()
+    queries = list(dict.fromkeys(pair["query"] for pair in pairs))
+    query_vectors = dict(zip(queries, normalize_rows([embedding_function.embed_query(q) for q in queries])))
+    chunk_vectors = normalize_rows(embedding_function.embed_documents([pair["chunk"] for pair in pairs]))
+    return np.array([query_vectors[pair["query"]] @ vector for pair, vector in zip(pairs, chunk_vectors)])
+
+
+def llm_labels(pairs, sims, relevant_score):
+    """Relevance labels from the LLM judge: one batched call per query."""
+    from backend.src.tools.grader import grader
+
+    labels = np.zeros(len(pairs), dtype=int)
+    for query in dict.fromkeys(pair["query"] for pair in pairs):
+        rows = [i for i, pair in enumerate(pairs) if pair["query"] == query]
+        texts = [pairs[i]["chunk"] for i in rows]
+        response = grader.chain.invoke(grader.grade_input(texts, query))
+        for i, score in zip(rows, grader.scores(texts, sims[rows], response)):
+            labels[i] = score >= relevant_score
+    return labels
+
+
+def cheap_scores(pairs, sims, lexical_weight):
+    from backend.src.tools.grader import cheap_score
+
+    return np.array([
+        cheap_score(sim, set(tokenize(pair["query"])), pair["chunk"], lexical_weight)
+        for pair, sim in zip(pairs, sims)
+    ])
+
+
+def thresholds(scores, labels, precision):
+    """(accept, reject): the widest band whose cheap decisions meet `precision`, or None for a side."""
+    accept = reject = None
+    for t in np.unique(scores):
+        if labels[scores >= t].mean() >= precision:
+            accept = math.ceil(t * 100) / 100
+            break
+    for t in np.unique(scores)[::-1]:
+        if 1 - labels[scores <= t].mean() >= precision:
+            reject = math.floor(t * 100) / 100
+            break
+    if accept is not None and reject is not None and reject >= accept:
+        reject = None
+    return accept, reject
+
+
+def evaluate(scores, labels, accept, reject):
+    accepted = scores >= accept if accept is not None else np.zeros(len(scores), dtype=bool)
+    rejected = scores <= reject if reject is not None else np.zeros(len(scores), dtype=bool)
+    decided = accepted | rejected
+    agree = labels[accepted].sum() + (1 - labels[rejected]).sum()
+    return {
+        "accepted": accepted.mean(),
+        "rejected": rejected.mean(),
+        "judged": 1 - decided.mean(),
+        "agreement": agree / decided.sum() if decided.any() else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", default=FIXTURES)
+    parser.add_argument("--precision", type=float, default=0.95)
+    parser.add_argument("--llm-labels", action="store_true")
+    parser.add_argument("--relevant-score", type=float, default=0.6)
+    args = parser.parse_args()
+
+    pairs = load_fixtures(args.fixtures)
+    sims = similarities(pairs)
+    if args.llm_labels:
+        labels = llm_labels(pairs, sims, args.relevant_score)
+    else:
+        labels = np.array([int(pair["relevant"]) for pair in pairs])
+    print(f"📏 {len(pairs)} pairs, {labels.sum()} relevant, similarity "
+          f"{sims[labels == 1].mean():.3f} relevant vs {sims[labels == 0].mean():.3f} not")
+
+    print(f"\n{'lexical w':>10}{'accept':>8}{'reject':>8}{'accepted':>10}{'rejected':>10}{'to LLM':>8}{'agree':>7}")
+    best = None
+    for weight in LEXICAL_WEIGHTS:
+        scores = cheap_scores(pairs, sims, weight)
+        accept, reject = thresholds(scores, labels, args.precision)
+        result = evaluate(scores, labels, accept, reject)
+        print(f"{weight:>10.2f}{accept if accept is not None else '-':>8}{reject if reject is not None else '-':>8}"
+              f"{result['accepted']:>10.0%}{result['rejected']:>10.0%}{result['judged']:>8.0%}"
+              f"{result['agreement']:>7.0%}")
+        if best is None or result["judged"] < best[3]["judged"]:
+            best = (weight, accept, reject, result)
+
+    weight, accept, reject, result = best
+    print(f"\n✅ The cheap tier decides {1 - result['judged']:.0%} of chunks at >= {args.precision:.0%} agreement:")
+    print(f"GRADER_LEXICAL_WEIGHT={weight}")
+    print(f"GRADER_ACCEPT_SCORE={accept if accept is not None else 1.01}")
+    print(f"GRADER_REJECT_SCORE={reject if reject is not None else -1.01}")
+
+
+if __name__ == "__main__":
+    main()
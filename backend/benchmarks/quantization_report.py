@@ -0,0 +1,164 @@
+"""
+Recall-vs-memory report for the ExactStore scan formats.
+
+For every combination of stored dimensionality, scan dtype and float32
+rescoring, builds per-domain ExactPartitions for a fixture corpus in a
+temporary directory and measures recall@k against float32 brute force,
+bytes per stored vector (scanned and total on disk) and query latency.
+
+The default corpus is synthetic and seeded: clustered unit vectors whose
+variance decays over the dimensions, like the leading-dimension-heavy
+spectrum text-embedding-005 is trained for. Real recall should be checked on
+exported embeddings: pass --corpus with an .npz holding `domains` (one per
+row) and `vectors`.
+
+Run from the repository root:
+    python -m backend.benchmarks.quantization_report [--corpus vectors.npz] [--output report.md]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from backend.src.tools.exact_store import ExactPartition
+from backend.src.tools.quantization import normalize_rows
+
+DIM = 768
+K = 4
+DIMENSIONS = (0, 512, 256, 128)
+DTYPES = ("float32", "float16", "int8")
+
+
+def synthetic_corpus(domains=60, seed=7):
+    rng = np.random.default_rng(seed)
+    spectrum = (1 + np.arange(DIM)) ** -0.5
+    topics = normalize_rows(rng.normal(size=(64, DIM)) * spectrum)
+    rows, labels = [], []
+    for d in range(domains):
+        n = int(rng.integers(30, 300))
+        centers = topics[rng.integers(0, len(topics), size=n)]
+        rows.append(normalize_rows(centers + 0.35 * rng.normal(size=(n, DIM)) * spectrum))
+        labels.extend([f"https://www.site{d}.com/"] * n)
+    return np.array(labels, dtype=object), np.concatenate(rows).astype(np.float32)
+
+
+def load_corpus(path):
+    data = np.load(path, allow_pickle=True)
+    return np.asarray(data["domains"], dtype=object), normalize_rows(data["vectors"])
+
+
+def group(domains, vectors):
+    corpus = {}
+    for domain in dict.fromkeys(domains):
+        corpus[domain] = vectors[domains == domain]
+    return corpus
+
+
+def make_queries(corpus, count, seed=11):
+    rng = np.random.default_rng(seed)
+    names = list(corpus)
+    queries = []
+    for _ in range(count):
+        domain = names[int(rng.integers(0, len(names)))]
+        base = corpus[domain][int(rng.integers(0, len(corpus[domain])))]
+        noise = rng.normal(size=base.shape) * np.abs(base).mean()
+        queries.append((domain, normalize_rows(base + noise)))
+    return queries
+
+
+def directory_bytes(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path) for name in names if name.endswith(".npy")
+    )
+
+
+def evaluate(corpus, queries, truth, dims, dtype, rescore):
+    root = tempfile.mkdtemp(prefix="quant_report_")
+    try:
+        partitions = {}
+        for i, (domain, vectors) in enumerate(corpus.items()):
+            partition = ExactPartition(os.path.join(root, str(i)), dtype, dims, rescore)
+            ids = [str(j) for j in range(len(vectors))]
+            partition.upsert(ids=ids, embeddings=vectors, documents=ids, metadatas=[{}] * len(ids))
+            partitions[domain] = partition
+
+        snapshots = [p.load() for p in partitions.values()]
+        rows = sum(len(s.ids) for s in snapshots)
+        scanned = sum(s.vectors.nbytes + (0 if s.scales is None else s.scales.nbytes) for s in snapshots)
+
+        hits, latencies = 0, []
+        for (domain, query), expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = [doc.id for doc, _ in partitions[domain].search(query, k=K)]
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len(set(found) & set(expected))
+
+        return {
+            "dims": dims or DIM,
+            "dtype": dtype,
+            "rescore": rescore and snapshots[0].full is not None,
+            "recall": hits / (K * len(queries)),
+            "scan_bytes": scanned / rows,
+            "disk_bytes": directory_bytes(root) / rows,
+            "p50_ms": statistics.median(latencies),
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def render(results, corpus_name, rows, domains, queries):
+    baseline = results[0]["scan_bytes"]
+    lines = [
+        f"# Exact store recall vs memory ({corpus_name})",
+        "",
+        f"{rows} vectors in {domains} domains, {queries} queries, recall@{K} against float32 brute force.",
+        "",
+        "| dims | dtype | rescore | recall@4 | scan B/vec | disk B/vec | scan vs f32 | p50 ms |",
+        "|---:|---|---|---:|---:|---:|---:|---:|",
+    ]
+    for r in results:
+        lines.append(
+            f"| {r['dims']} | {r['dtype']} | {'yes' if r['rescore'] else 'no'} | {r['recall']:.3f} "
+            f"| {r['scan_bytes']:.0f} | {r['disk_bytes']:.0f} | {baseline / r['scan_bytes']:.1f}x | {r['p50_ms']:.3f} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    domains, vectors = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    corpus = group(domains, vectors)
+    queries = make_queries(corpus, args.queries)
+    truth = [[str(i) for i in np.argsort(-(corpus[d] @ q))[:K]] for d, q in queries]
+
+    results = []
+    for dims in DIMENSIONS:
+        for dtype in DTYPES:
+            for rescore in (False, True):
+                lossy = dtype != "float32" or dims
+                if rescore and not lossy:
+                    continue
+                results.append(evaluate(corpus, queries, truth, dims, dtype, rescore))
+                print(f"   {dims or DIM}-d {dtype} rescore={rescore}: recall {results[-1]['recall']:.3f}")
+
+    report = render(results, os.path.basename(args.corpus) if args.corpus else "synthetic fixture corpus",
+                    len(vectors), len(corpus), len(queries))
+    print()
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+
+
+if __name__ == "__main__":
+    main()
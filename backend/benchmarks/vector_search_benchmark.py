@@ -0,0 +1,202 @@
+"""
+Compare per-domain top-k search on the Chroma path and on the ExactStore.
+
+Builds a synthetic corpus (clustered unit vectors, tens to hundreds of
+chunks per domain) into a temporary directory as
+  - one shared Chroma collection queried with a domain filter,
+  - per-domain Chroma partitions,
+  - per-domain memory-mapped ExactStore partitions,
+then queries each layout in a fresh subprocess so resident memory is
+measured in isolation. Query embedding is excluded: every backend gets the
+same precomputed query vectors. Recall@k is measured against brute force.
+
+Run from the repository root:
+    python -m backend.benchmarks.vector_search_benchmark [--domains 100] [--queries 300]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKENDS = ("chroma-shared", "chroma-partitioned", "exact")
+DIM = 768
+K = 4
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def unit(matrix):
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True)
+
+
+def make_corpus(domains, seed=7):
+    """{domain: (ids, documents, vectors)} with a few topic clusters per domain."""
+    rng = np.random.default_rng(seed)
+    topics = unit(rng.normal(size=(64, DIM)))
+    corpus = {}
+    for d in range(domains):
+        n = int(rng.integers(30, 300))
+        centers = topics[rng.integers(0, len(topics), size=n)]
+        vectors = unit(centers + 0.6 * rng.normal(size=(n, DIM)) / np.sqrt(DIM) * 8).astype(np.float32)
+        domain = f"https://www.site{d}.com/"
+        ids = [f"{d}-{i}" for i in range(n)]
+        documents = [f"chunk {i} of {domain}" for i in range(n)]
+        corpus[domain] = (ids, documents, vectors)
+    return corpus
+
+
+def make_queries(corpus, count, seed=11):
+    rng = np.random.default_rng(seed)
+    domains = list(corpus)
+    queries = []
+    for _ in range(count):
+        domain = domains[int(rng.integers(0, len(domains)))]
+        vectors = corpus[domain][2]
+        base = vectors[int(rng.integers(0, len(vectors)))]
+        queries.append((domain, unit(base + 0.3 * rng.normal(size=DIM) / np.sqrt(DIM) * 8).astype(np.float32)))
+    return queries
+
+
+def build(root, corpus):
+    import chromadb
+    from backend.src.tools.exact_store import ExactPartition
+    from backend.src.tools.partitions import partition_name
+
+    client = chromadb.PersistentClient(path=os.path.join(root, "chroma"))
+    shared = client.get_or_create_collection("vectorDB")
+    started = time.perf_counter()
+    for domain, (ids, documents, vectors) in corpus.items():
+        metadatas = [{"domain": domain, "source": domain} for _ in ids]
+        shared.add(ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors)
+        client.get_or_create_collection(partition_name(domain, mode="domain")).add(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors
+        )
+        ExactPartition(os.path.join(root, "exact", partition_name(domain, mode="domain"))).upsert(
+            ids=ids, documents=documents, metadatas=metadatas, embeddings=vectors
+        )
+    print(f"🏗️ Built {sum(len(c[0]) for c in corpus.values())} chunks in {len(corpus)} domains "
+          f"({time.perf_counter() - started:.1f}s)")
+
+
+def run_queries(backend, root, queries_path):
+    """Runs in a subprocess; prints one JSON line of results."""
+    from backend.src.tools.partitions import partition_name
+
+    data = np.load(queries_path, allow_pickle=True)
+    domains, vectors = list(data["domains"]), data["vectors"]
+    if backend == "exact":
+        from backend.src.tools.exact_store import ExactPartition
+    else:
+        import chromadb
+    # Growth is measured from after the imports: data and index memory only
+    baseline = rss_mb()
+
+    if backend == "exact":
+        partitions = {}
+
+        def search(domain, vector):
+            name = partition_name(domain, mode="domain")
+            if name not in partitions:
+                partitions[name] = ExactPartition(os.path.join(root, "exact", name))
+            return [doc.id for doc, _ in partitions[name].search(vector, k=K)]
+    else:
+        client = chromadb.PersistentClient(path=os.path.join(root, "chroma"))
+        collections = {}
+
+        def search(domain, vector):
+            name = "vectorDB" if backend == "chroma-shared" else partition_name(domain, mode="domain")
+            if name not in collections:
+                collections[name] = client.get_collection(name)
+            where = {"domain": domain} if backend == "chroma-shared" else None
+            return collections[name].query(query_embeddings=[vector], n_results=K, where=where)["ids"][0]
+
+    # First pass loads indexes and maps files; the second is the steady state
+    cold_started = time.perf_counter()
+    for domain, vector in zip(domains, vectors):
+        search(domain, vector)
+    cold = time.perf_counter() - cold_started
+
+    latencies, results = [], []
+    for domain, vector in zip(domains, vectors):
+        started = time.perf_counter()
+        results.append(search(domain, vector))
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    latencies.sort()
+    print(json.dumps({
+        "backend": backend,
+        "cold_total_s": cold,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "rss_mb": rss_mb(),
+        "rss_growth_mb": rss_mb() - baseline,
+        "results": results,
+    }))
+
+
+def recall(results, truth):
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domains", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--query-backend", choices=BACKENDS)
+    parser.add_argument("--root")
+    args = parser.parse_args()
+
+    if args.query_backend:
+        run_queries(args.query_backend, args.root, os.path.join(args.root, "queries.npz"))
+        return
+
+    root = tempfile.mkdtemp(prefix="vector_bench_")
+    try:
+        corpus = make_corpus(args.domains)
+        queries = make_queries(corpus, args.queries)
+        build(root, corpus)
+        np.savez(
+            os.path.join(root, "queries.npz"),
+            domains=np.array([d for d, _ in queries], dtype=object),
+            vectors=np.stack([v for _, v in queries]),
+        )
+
+        truth = []
+        for domain, vector in queries:
+            ids, _, vectors = corpus[domain]
+            truth.append([ids[i] for i in np.argsort(-(vectors @ vector))[:K]])
+
+        print(f"\n{'backend':<20}{'p50 ms':>9}{'p95 ms':>9}{'cold s':>9}{'RSS MB':>9}{'+RSS MB':>9}{'recall':>8}")
+        for backend in BACKENDS:
+            output = subprocess.run(
+                [sys.executable, "-m", "backend.benchmarks.vector_search_benchmark",
+                 "--query-backend", backend, "--root", root],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{backend:<20}{result['p50_ms']:>9.3f}{result['p95_ms']:>9.3f}{result['cold_total_s']:>9.2f}"
+                  f"{result['rss_mb']:>9.0f}{result['rss_growth_mb']:>9.0f}{recall(result['results'], truth):>8.3f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
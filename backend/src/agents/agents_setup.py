@@ -5,9 +5,10 @@ from backend.auth.init_vertex import init_vertex_ai
 from langchain_core.messages import AIMessage
 
 # Local Imports
-from backend.src.agents.research_team import retrieve_and_grade
+from backend.src.agents.research_team import aretrieve_and_grade
 from backend.src.agents.state_setup import ClauseBitState
 from backend.src.agents.research_team import get_cached_db_status
+from backend.src.utils.rate_governor import governor
 
 
 init_vertex_ai()
@@ -33,7 +34,7 @@ def extract_email(text):
         return False
 
 
-def search_node(state: ClauseBitState) -> ClauseBitState:
+async def search_node(state: ClauseBitState) -> ClauseBitState:
     """Search node with timeout and result limiting"""
     try:
 
@@ -50,7 +51,7 @@ def search_node(state: ClauseBitState) -> ClauseBitState:
         metadata = {"domain":state.current_url}
         print(metadata)
         print(f"current qurstion {user_question}")
-        context = retrieve_and_grade(query = user_question, metadata =metadata )
+        context = await aretrieve_and_grade(query = user_question, metadata =metadata )
         #print(f"context:{context}")
 
         if context:
@@ -70,7 +71,7 @@ def search_node(state: ClauseBitState) -> ClauseBitState:
         )
 
       #  print(f"Using LLM Node:{full_prompt}")
-        llm_response = llm.invoke(full_prompt)
+        llm_response = await governor.arun(llm, "generate", lambda: llm.ainvoke(full_prompt))
         response_content = llm_response.content
 
         new_message = AIMessage(content=response_content, name="search")
@@ -92,7 +93,7 @@ def search_node(state: ClauseBitState) -> ClauseBitState:
             current_query=state.current_query,
         )
 
-def llm_answer_node(state: ClauseBitState) -> ClauseBitState:
+async def llm_answer_node(state: ClauseBitState) -> ClauseBitState:
     """ Faster LLM responses with shorter context"""
     current_question =state.messages[-1]
     context = state.messages
@@ -106,7 +107,7 @@ def llm_answer_node(state: ClauseBitState) -> ClauseBitState:
         f"Do not include: Markdown formatting (like **bold**, bullet points, or headings)"
     )
     #print(f"Using LLM Node:{full_prompt}")
-    llm_response = llm.invoke(full_prompt)
+    llm_response = await governor.arun(llm, "generate", lambda: llm.ainvoke(full_prompt))
     response_content = llm_response.content
 
     new_message = AIMessage(content=response_content, name="llm_answer")
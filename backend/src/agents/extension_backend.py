@@ -1,7 +1,10 @@
+from functools import lru_cache
+
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_vertexai import ChatVertexAI
 
-from backend.src.tools.vector_store import VectorStoreManager
+from backend.src.tools.vector_store import get_vector_store_manager
+from backend.src.utils.rate_governor import governor
 from langchain_core.prompts import ChatPromptTemplate
 # Set environment variables early
 #os.environ["LANGSMITH_API_KEY"] = os.environ.get("LANGSMITH_API_KEY", "")
@@ -12,8 +15,15 @@ import os
 os.environ["LANGCHAIN_TRACING_V2"] = "false"
 
 
-def summary(url: str):
+SUMMARY_QUERY = (
+    "Summarize all clauses related to data sharing, user consent, third-party access, "
+    "data retention, tracking, targeted advertising, user rights, and account deletion. "
+    "Highlight anything that could affect user privacy or security."
+)
+
 
+@lru_cache(maxsize=1)
+def summary_chain():
     prompt = ChatPromptTemplate.from_messages([
         ("system",
          '''You are a policy analyzer that extracts structured privacy clause summaries from legal content (e.g., Terms of Service, Privacy Policies). 
@@ -74,17 +84,6 @@ def summary(url: str):
 
     ])
 
-    query = (
-        "Summarize all clauses related to data sharing, user consent, third-party access, "
-        "data retention, tracking, targeted advertising, user rights, and account deletion. "
-        "Highlight anything that could affect user privacy or security."
-    )
-
-    metadata = {"domain": url}
-
-    vectorstore = VectorStoreManager()
-    data = vectorstore.vectordb_query_chatbot(query=query, k=4, metadata_filter=metadata)
-
     # LLM
     llm = ChatVertexAI(
         model="gemini-2.0-flash-lite",
@@ -92,11 +91,20 @@ def summary(url: str):
         max_output_tokens=500
     )
     base_chain = prompt | llm | JsonOutputParser()
+    return llm, base_chain
+
 
-    response = base_chain.invoke({
+def summary(url: str):
+    metadata = {"domain": url}
+
+    vectorstore = get_vector_store_manager()
+    data = vectorstore.vectordb_query_chatbot(query=SUMMARY_QUERY, k=4, metadata_filter=metadata)
+
+    llm, base_chain = summary_chain()
+    response = governor.run(llm, "generate", lambda: base_chain.invoke({
         "data": data,
         "url": url
-    })
+    }))
     print("done")
 
     if response["error"] == True:
@@ -109,7 +117,31 @@ def summary(url: str):
     return response
 
 
-def summary_no_retrieval(url:str):
+async def asummary(url: str):
+    """`summary` without blocking the event loop: async retrieval and LLM call."""
+    metadata = {"domain": url}
+
+    vectorstore = get_vector_store_manager()
+    data = await vectorstore.avectordb_query_chatbot(query=SUMMARY_QUERY, k=4, metadata_filter=metadata)
+
+    llm, base_chain = summary_chain()
+    response = await governor.arun(llm, "generate", lambda: base_chain.ainvoke({
+        "data": data,
+        "url": url
+    }))
+    print("done")
+
+    if response["error"] == True:
+        print("Using LLM fallback!")
+        response = await asummary_no_retrieval(url)
+
+        print(response)
+
+    return response
+
+
+@lru_cache(maxsize=1)
+def no_retrieval_chain():
     prompt = ChatPromptTemplate.from_messages([
         ("system",
          '''You are a policy analyzer that generates structured privacy clause summaries based on your existing knowledge of specific companies and their privacy policies.
@@ -175,14 +207,26 @@ def summary_no_retrieval(url:str):
         max_output_tokens=3000
     )
     base_chain = prompt | llm | JsonOutputParser()
+    return llm, base_chain
 
-    response = base_chain.invoke({
+
+def summary_no_retrieval(url:str):
+    llm, base_chain = no_retrieval_chain()
+    response = governor.run(llm, "generate", lambda: base_chain.invoke({
         "url": url
-    })
+    }))
     print("done")
     print(url)
 
     return response
 
 
+async def asummary_no_retrieval(url: str):
+    llm, base_chain = no_retrieval_chain()
+    response = await governor.arun(llm, "generate", lambda: base_chain.ainvoke({
+        "url": url
+    }))
+    print("done")
+    print(url)
 
+    return response
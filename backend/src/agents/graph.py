@@ -1,3 +1,4 @@
+import asyncio
 from typing import Optional, List, Dict
 
 from langchain_core.messages import HumanMessage, AIMessage
@@ -108,7 +109,7 @@ def chat():
             conversation_messages.append(user_msg)
 
             state = ClauseBitState(messages=conversation_messages, current_url=url)
-            result = research_graph.invoke(state)
+            result = asyncio.run(research_graph.ainvoke(state))
 
             msgs = result["messages"]
             last_ai_messages = [m for m in msgs if isinstance(m, AIMessage)]
@@ -130,7 +131,7 @@ def chat():
             print(f"🚀 ClauseBit: Sorry, an error occurred: {str(e)}")
             print("Please try again or type 'quit' to exit.\n")
 
-def end_point_chat( question: str,
+async def end_point_chat( question: str,
         session_id: str,
         user_id: str,
         current_url: Optional[str] = None,
@@ -155,7 +156,7 @@ def end_point_chat( question: str,
 
     # Process with your research graph
     state = ClauseBitState(messages=conversation_messages, current_url=current_url)
-    result = research_graph.invoke(state)
+    result = await research_graph.ainvoke(state)
 
     # Extract response
     msgs = result["messages"]
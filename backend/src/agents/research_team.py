@@ -6,8 +6,8 @@ from backend.src.tools.datatracker import get_company_by_url
 from functools import lru_cache
 import asyncio
 # Local imports
-from backend.src.tools.vector_store import VectorStoreManager
-from backend.src.tools.grader import Grader
+from backend.src.tools.vector_store import get_vector_store_manager
+from backend.src.tools.grader import grader as shared_grader
 # Tool setup
 from langchain_core.tools import tool
 
@@ -27,7 +27,7 @@ executor = ThreadPoolExecutor(max_workers=4)
 def fetch_web_data_to_db_async(url: str):
     """Non-blocking version of web data fetching"""
     def _fetch():
-        vectorstore = VectorStoreManager()
+        vectorstore = get_vector_store_manager()
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         return loop.run_until_complete(vectorstore.proto_add_final(url))
@@ -36,29 +36,42 @@ def fetch_web_data_to_db_async(url: str):
 
 def retrieve_and_grade(query: str, is_preference_data: bool = False, metadata: Dict[str, str] = None)-> List[Dict]:
     """Retrieves chunks for a query and grades them for relevance, completeness, and faithfulness."""
-    vectorstore = VectorStoreManager()
-    grader = Grader()
+    vectorstore = get_vector_store_manager()
 
     if is_preference_data:
         retrieved_chunks = vectorstore.vectordb_query_filtering(query, metadata)
     else:
         retrieved_chunks = vectorstore.vectordb_query_chatbot(query = query, metadata_filter = metadata)
 
-    # Extract only the page_content to feed into the grader
-    chunk_texts = [doc.page_content for doc in retrieved_chunks]
-    # Grade the extracted texts
-    grade_report = grader.CompositeGrader(chunk_texts, query)
-    # merge the mean chunk quality score in the chunk document
-    for chunk in retrieved_chunks:
-        chunk.metadata["retrieval_quality_score"] = grade_report
+    # Grade every retrieved chunk in one call; the result carries their stored vectors, so nothing is re-embedded
+    scores = shared_grader.grade(retrieved_chunks, query)
+    # merge each chunk's own quality score in its document
+    for chunk, score in zip(retrieved_chunks, scores):
+        chunk.metadata["retrieval_quality_score"] = score
 
-    return retrieved_chunks
+    return shared_grader.rank(retrieved_chunks, scores)
+
+
+async def aretrieve_and_grade(query: str, is_preference_data: bool = False, metadata: Dict[str, str] = None) -> List[Dict]:
+    """Async `retrieve_and_grade`: async retrieval and one awaited grading call."""
+    vectorstore = get_vector_store_manager()
+
+    if is_preference_data:
+        retrieved_chunks = await vectorstore.avectordb_query_filtering(query, metadata_filter=metadata)
+    else:
+        retrieved_chunks = await vectorstore.avectordb_query_chatbot(query=query, metadata_filter=metadata)
+
+    scores = await shared_grader.agrade(retrieved_chunks, query)
+    for chunk, score in zip(retrieved_chunks, scores):
+        chunk.metadata["retrieval_quality_score"] = score
+
+    return shared_grader.rank(retrieved_chunks, scores)
 
 
 @tool
 def retriever(query: str, ispreferencedata: bool = False, metadata: Dict[str, str] = None) -> List[Dict]:
     """ OPTIMIZED: Faster retrieval with caching and limits"""
-    vectorstore = VectorStoreManager()
+    vectorstore = get_vector_store_manager()
 
     # Limit results for faster processing
     if ispreferencedata:
@@ -74,18 +87,10 @@ def check_db(url: str):
     return get_cached_db_status(url)
 
 
-q ="privacy"
-m= {'domain': 'https://www.rtings.com/'}
-
-
-query = (
-        "Summarize all clauses related to data sharing, user consent, third-party access, "
-        "data retention, tracking, targeted advertising, user rights, and account deletion. "
-        "Highlight anything that could affect user privacy or security."
-        "github"
-        ""
-    )
-metadata = {"domain":"https://www.youtube.com/"}
-d = retrieve_and_grade(query= q, metadata= m)
+if __name__ == "__main__":
+    # Manual check; importing the module must not query the store or the LLM
+    q = "privacy"
+    m = {'domain': 'https://www.rtings.com/'}
+    d = retrieve_and_grade(query=q, metadata=m)
 
-print(d)
\ No newline at end of file
+    print(d)
@@ -6,6 +6,7 @@ import re
 #Local Imports
 from backend.src.agents.state_setup import  ClauseBitState
 from backend.src.agents.research_team import get_cached_db_status,fetch_web_data_to_db_async
+from backend.src.utils.rate_governor import governor
 
 
 def extract_email(text):
@@ -88,7 +89,7 @@ def make_supervisor_node(llm: BaseChatModel, members: list[str]):
                 formatted_messages.append({"role": "assistant", "content": msg.content})
 
         messages = [{"role": "system", "content": system_prompt}] + formatted_messages
-        response = llm.with_structured_output(Router).invoke(messages)
+        response = governor.run(llm, "generate", lambda: llm.with_structured_output(Router).invoke(messages))
         print("[Supervisor routed to]:", response)
 
         goto = response["next"]
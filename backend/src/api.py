@@ -1,15 +1,31 @@
+import asyncio
 import uvicorn
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from backend.src.router import router
 from google.cloud import firestore
 from backend.src.agents.graph import end_point_chat
-from backend.src.tools.vector_store import VectorStoreManager
+from backend.src.tools.vector_store import get_vector_store_manager
+from backend.src.tools.store_registry import store_registry
+from backend.src.tools.exact_store import exact_store
+from backend.src.tools.lexical_index import lexical_index
+from backend.src.tools.vector_snapshot import vector_snapshot
+from backend.src.tools.grader import grader
+from backend.src.tools.grade_cache import grade_cache
 from backend.src.utils.chatbot_memory import save_conversation, get_saved_conversation
 from backend.src.utils.models import ChatRequest, ChatMemory, UrlRequest
-from backend.src.agents.extension_backend import summary, summary_no_retrieval
+from backend.src.agents.extension_backend import asummary, asummary_no_retrieval
 from backend.src.tools.datatracker import get_company_by_url
+from backend.src.tools.browser_pool import browser_pool
+from backend.src.tools.http_client import http_client
+from backend.src.tools.bot_detection import bot_detection_stats
+from backend.src.tools.request_filter import interception_stats
+from backend.src.tools.text_extraction import shutdown_extraction_pool
+from backend.src.tools.enrichment_cache import enrichment_cache
+from backend.src.utils.rate_governor import governor
+from backend.src.tools.embedding_cache import embedding_cache
 
 import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module="vertexai")
@@ -20,8 +36,23 @@ from backend.auth.init_vertex import init_vertex_ai
 init_vertex_ai()
 
 
+# ♻️ Shared resources live for the whole process
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await http_client.start()
+    await browser_pool.start()
+    store_registry.start()
+    vector_snapshot.open()
+    yield
+    store_registry.close()
+    await browser_pool.close()
+    await http_client.close()
+    shutdown_extraction_pool()
+    embedding_cache.flush()
+
+
 # 🔧 FastAPI Setup
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.include_router(router)
 
 
@@ -49,7 +80,7 @@ async def chat_endpoint(req: ChatRequest):
     print(f"url:{req.current_url}")
 
 
-    message_history =get_saved_conversation(req.session_id,req.user_id)
+    message_history = await asyncio.to_thread(get_saved_conversation, req.session_id, req.user_id)
 
     if not message_history:
         messages = None
@@ -57,7 +88,7 @@ async def chat_endpoint(req: ChatRequest):
         messages = message_history["messages"]
 
     # Process the chat message
-    result = end_point_chat(
+    result = await end_point_chat(
         question=req.question,
         session_id=req.session_id,
         user_id=req.user_id,
@@ -70,7 +101,7 @@ async def chat_endpoint(req: ChatRequest):
     print(f" ClauseBit: {response}")
 
     # Save conversation
-    save_conversation(req.session_id, req.question, response, req.user_id)
+    await asyncio.to_thread(save_conversation, req.session_id, req.question, response, req.user_id)
 
     return {"response": response}
 
@@ -78,16 +109,16 @@ async def chat_endpoint(req: ChatRequest):
 async def summary_endpoint(req: UrlRequest):
     print("🔍 Requested summary for:", req.company_name)
 
-    status = get_company_by_url(req.company_name)
+    status = await asyncio.to_thread(get_company_by_url, req.company_name)
 
     if type(status) == bool:
-        return summary(req.company_name)
+        return await asummary(req.company_name)
 
     if not status["found_data"]:
-        dic = summary_no_retrieval(req.company_name)
+        dic = await asummary_no_retrieval(req.company_name)
 
     else:
-        dic = summary(req.company_name)
+        dic = await asummary(req.company_name)
 
     return dic
 
@@ -96,7 +127,7 @@ async def summary_endpoint(req: UrlRequest):
 async def summary_endpoint(req: UrlRequest):
     print("🔍 Requested collector for:", req.company_name)
     status = get_company_by_url(req.company_name)
-    vectorstore = VectorStoreManager()
+    vectorstore = get_vector_store_manager()
     if not status:
         print("Triggered Web search!")
         await vectorstore.proto_add_final(req.company_name)
@@ -141,6 +172,24 @@ async def get_recent_chats(user_id: str):
         for doc in docs
     ]
 
+# 📊 Runtime counters
+@app.get("/stats")
+async def stats():
+    return {
+        "browser_pool": browser_pool.stats(),
+        "bot_detection": bot_detection_stats(),
+        "request_filter": interception_stats(),
+        "enrichment_cache": enrichment_cache.stats(),
+        "rate_governor": governor.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "store_registry": store_registry.stats(),
+        "exact_store": exact_store.stats(),
+        "lexical_index": lexical_index.stats(),
+        "vector_snapshot": vector_snapshot.stats(),
+        "grader": grader.stats(),
+        "grade_cache": grade_cache.stats(),
+    }
+
 # landing page
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -0,0 +1,140 @@
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Optional
+
+BOT_TITLE_KEYWORDS = [
+    "verify", "captcha", "robot", "human", "security check",
+    "access denied", "blocked", "cloudflare", "just a moment",
+    "checking your browser", "ddos protection", "rate limit"
+]
+
+BOT_SELECTORS = [
+    # Cloudflare
+    ".cf-browser-verification",
+    "#cf-wrapper",
+    ".cf-checking-browser",
+
+    # Generic CAPTCHA
+    "[data-callback*='captcha']",
+    ".g-recaptcha",
+    ".h-captcha",
+    ".captcha",
+
+    # Access denied pages
+    ".access-denied",
+    ".blocked",
+
+    # Rate limiting
+    ".rate-limit",
+    ".too-many-requests",
+
+    # Security checks
+    ".security-check",
+    ".verification-required"
+]
+
+BOT_TEXT_INDICATORS = [
+    "verify you are human",
+    "complete the captcha",
+    "security check",
+    "checking your browser",
+    "just a moment",
+    "ddos protection",
+    "cloudflare",
+    "access denied",
+    "rate limited",
+    "too many requests",
+    "suspicious activity"
+]
+
+VERIFICATION_URL_PATTERNS = [
+    "captcha", "verify", "security", "blocked", "denied",
+    "cloudflare", "ddos", "rate-limit"
+]
+
+# Runs inside the page: checks every signal in the same order as before, in one round-trip
+DETECT_SCRIPT = """
+(signals) => {
+    const title = document.title || "";
+    const titleLower = title.toLowerCase();
+    for (const keyword of signals.title) {
+        if (titleLower.includes(keyword)) return {kind: "title", signal: keyword, detail: title};
+    }
+
+    for (const selector of signals.selectors) {
+        try {
+            if (document.querySelector(selector)) return {kind: "selector", signal: selector, detail: null};
+        } catch (e) {}
+    }
+
+    const html = document.documentElement ? document.documentElement.outerHTML.toLowerCase() : "";
+    for (const indicator of signals.text) {
+        if (html.includes(indicator)) return {kind: "text", signal: indicator, detail: null};
+    }
+
+    const url = location.href;
+    const urlLower = url.toLowerCase();
+    for (const pattern of signals.url) {
+        if (urlLower.includes(pattern)) return {kind: "url", signal: pattern, detail: url};
+    }
+
+    return null;
+}
+"""
+
+SIGNALS = {
+    "title": BOT_TITLE_KEYWORDS,
+    "selectors": BOT_SELECTORS,
+    "text": BOT_TEXT_INDICATORS,
+    "url": VERIFICATION_URL_PATTERNS,
+}
+
+
+@dataclass
+class BotVerdict:
+    detected: bool
+    kind: Optional[str] = None  # "title", "selector", "text" or "url"
+    signal: Optional[str] = None
+    detail: Optional[str] = None
+    error: Optional[str] = None
+
+
+_lock = threading.Lock()
+_checks = Counter()
+_signal_hits = Counter()
+
+
+def _count(verdict: BotVerdict):
+    with _lock:
+        _checks["pages"] += 1
+        if verdict.error:
+            _checks["errors"] += 1
+        if verdict.detected:
+            _checks["detected"] += 1
+            _signal_hits[f"{verdict.kind}:{verdict.signal}"] += 1
+
+
+async def detect_bot_verdict(page) -> BotVerdict:
+    """Evaluate all bot-verification signals in a single in-page evaluation."""
+    try:
+        hit = await page.evaluate(DETECT_SCRIPT, SIGNALS)
+        if hit:
+            verdict = BotVerdict(True, hit["kind"], hit["signal"], hit.get("detail"))
+        else:
+            verdict = BotVerdict(False)
+    except Exception as e:
+        verdict = BotVerdict(False, error=str(e))
+
+    _count(verdict)
+    return verdict
+
+
+def bot_detection_stats():
+    with _lock:
+        return {
+            "pages_checked": _checks["pages"],
+            "detected": _checks["detected"],
+            "errors": _checks["errors"],
+            "signal_hits": dict(_signal_hits.most_common()),
+        }
@@ -0,0 +1,203 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+# Pool sizing (override per Cloud Run instance size)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "50"))
+
+LAUNCH_ARGS = ["--no-sandbox", "--disable-dev-shm-usage"]
+
+
+class PooledBrowser:
+    """A warm Chromium with its idle (context, page) slots and navigation count."""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.idle = []
+        self.active = 0
+        self.navigations = 0
+        self.retiring = False
+
+    def healthy(self):
+        return self.browser.is_connected() and not self.retiring
+
+
+class BrowserPool:
+    """
+    Process-wide pool of warm Chromium browsers.
+
+    Started and closed from the FastAPI lifespan. Callers borrow a page with
+    `async with browser_pool.page() as page:`; at most `max_pages` pages are
+    open per browser, idle pages are reset and reused, and a browser is
+    recycled once it has served `recycle_after` navigations or disconnects.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_pages=BROWSER_MAX_PAGES,
+                 recycle_after=BROWSER_RECYCLE_AFTER):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.recycle_after = max(1, recycle_after)
+
+        self._playwright = None
+        self._browsers = []
+        self._slots = None
+        self._lock = None
+        self._loop = None
+        self.launches = 0
+        self.recycles = 0
+
+    @property
+    def started(self):
+        return self._playwright is not None
+
+    async def start(self):
+        if self.started:
+            return
+
+        self._loop = asyncio.get_running_loop()
+        self._lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(self.size * self.max_pages)
+        self._playwright = await async_playwright().start()
+
+        for _ in range(self.size):
+            self._browsers.append(await self._launch())
+
+        print(f"🧭 Browser pool started: {self.size} browser(s), {self.max_pages} page(s) each")
+
+    async def close(self):
+        if not self.started:
+            return
+
+        for pooled in self._browsers:
+            await self._close_browser(pooled)
+        self._browsers = []
+
+        await self._playwright.stop()
+        self._playwright = None
+        self._loop = None
+        print("🧭 Browser pool closed")
+
+    async def _launch(self):
+        browser = await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+        self.launches += 1
+        return PooledBrowser(browser)
+
+    async def _close_browser(self, pooled):
+        try:
+            await pooled.browser.close()
+        except Exception as e:
+            print(f"⚠️ Error closing pooled browser: {e}")
+
+    async def _acquire(self):
+        """Pick the least busy healthy browser, replacing dead ones, and hand out a page."""
+        async with self._lock:
+            for i, pooled in enumerate(self._browsers):
+                if not pooled.browser.is_connected():
+                    print("♻️ Pooled browser disconnected, relaunching")
+                    self._browsers[i] = await self._launch()
+
+            candidates = [b for b in self._browsers if b.healthy()]
+            if not candidates:
+                # Every browser is retiring; add a fresh one alongside them
+                pooled = await self._launch()
+                self._browsers.append(pooled)
+                candidates = [pooled]
+
+            pooled = min(candidates, key=lambda b: b.active)
+            pooled.active += 1
+
+            while pooled.idle:
+                context, page = pooled.idle.pop()
+                if not page.is_closed():
+                    return pooled, context, page
+                await context.close()
+
+        try:
+            context = await pooled.browser.new_context()
+            page = await context.new_page()
+        except Exception:
+            pooled.active -= 1
+            raise
+        return pooled, context, page
+
+    async def _release(self, pooled, context, page, reusable):
+        pooled.active -= 1
+        pooled.navigations += 1
+
+        if pooled.navigations >= self.recycle_after:
+            pooled.retiring = True
+
+        if reusable and not pooled.retiring and not page.is_closed():
+            try:
+                await page.goto("about:blank")
+                await context.clear_cookies()
+                pooled.idle.append((context, page))
+            except Exception:
+                reusable = False
+
+        if not reusable or pooled.retiring:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+        if pooled.retiring and pooled.active == 0:
+            async with self._lock:
+                if pooled in self._browsers:
+                    self._browsers.remove(pooled)
+                    for idle_context, _ in pooled.idle:
+                        try:
+                            await idle_context.close()
+                        except Exception:
+                            pass
+                    await self._close_browser(pooled)
+                    self.recycles += 1
+                    print(f"♻️ Recycled browser after {pooled.navigations} navigations")
+                if len(self._browsers) < self.size:
+                    self._browsers.append(await self._launch())
+
+    @asynccontextmanager
+    async def _ephemeral_page(self):
+        # Used outside the app loop (scripts, background threads with their own loop)
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True, args=LAUNCH_ARGS)
+            try:
+                page = await browser.new_page()
+                yield page
+            finally:
+                await browser.close()
+
+    @asynccontextmanager
+    async def page(self):
+        if not self.started or asyncio.get_running_loop() is not self._loop:
+            async with self._ephemeral_page() as page:
+                yield page
+            return
+
+        async with self._slots:
+            pooled, context, page = await self._acquire()
+            reusable = True
+            try:
+                yield page
+            except Exception:
+                reusable = False
+                raise
+            finally:
+                await self._release(pooled, context, page, reusable)
+
+    def stats(self):
+        return {
+            "started": self.started,
+            "browsers": len(self._browsers),
+            "active_pages": sum(b.active for b in self._browsers),
+            "idle_pages": sum(len(b.idle) for b in self._browsers),
+            "launches": self.launches,
+            "recycles": self.recycles,
+        }
+
+
+browser_pool = BrowserPool()
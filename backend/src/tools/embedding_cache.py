@@ -0,0 +1,305 @@
+import hashlib
+import os
+import re
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from backend.src.utils.rate_governor import governor
+from backend.src.utils.storage import SQLiteStore
+
+EMBED_CACHE_MAX_ENTRIES = int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "50000"))
+EMBED_CACHE_EVICT_TO = 0.9
+EMBED_CACHE_EVICT_EVERY = 100
+# text-embedding-005 returns 768-d vectors
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "768"))
+
+VECTOR_DTYPE = np.float32
+MIN_CAPACITY = 1024
+
+
+def text_key(text: str) -> str:
+    """Whitespace-insensitive text hash; embeddings don't change with layout."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+class VectorFile:
+    """Fixed-width rows of float32 vectors in one memory-mapped file, addressed by slot."""
+
+    def __init__(self, path, dim):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * np.dtype(VECTOR_DTYPE).itemsize
+        self.array = None
+        self.capacity = 0
+        if not os.path.exists(path):
+            open(path, "wb").close()
+        self._map()
+
+    def _map(self):
+        size = os.path.getsize(self.path)
+        self.capacity = size // self.row_bytes
+        self.array = None
+        if self.capacity:
+            self.array = np.memmap(self.path, dtype=VECTOR_DTYPE, mode="r+", shape=(self.capacity, self.dim))
+
+    def ensure(self, slot):
+        if slot < self.capacity:
+            return
+        self._map()  # another process may have grown the file
+        if slot < self.capacity:
+            return
+        if self.array is not None:
+            self.array.flush()
+        new_capacity = max(MIN_CAPACITY, self.capacity * 2, slot + 1)
+        with open(self.path, "r+b") as f:
+            f.truncate(new_capacity * self.row_bytes)
+        self._map()
+
+    def read(self, slot):
+        self.ensure(slot)
+        return self.array[slot].tolist()
+
+    def write(self, slot, vector):
+        self.ensure(slot)
+        self.array[slot] = vector
+
+    def flush(self):
+        if self.array is not None:
+            self.array.flush()
+
+
+class EmbeddingCache(SQLiteStore):
+    """
+    Local embedding cache: a SQLite index (key -> slot, last access) over
+    memory-mapped float32 matrices, one file per model and dimensionality.
+    Least recently used entries are evicted and their slots reused.
+    """
+
+    def __init__(self, path=None, max_entries=EMBED_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.files = {}
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+        super().__init__("embeddings.sqlite", path)
+        self.vector_dir = os.path.join(os.path.dirname(self.path), "embeddings")
+        os.makedirs(self.vector_dir, exist_ok=True)
+
+    def setup(self, conn):
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dim INTEGER NOT NULL,
+                key TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, dim, key)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (model, dim, last_access)")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS free_slots (
+                model TEXT NOT NULL, dim INTEGER NOT NULL, slot INTEGER NOT NULL,
+                PRIMARY KEY (model, dim, slot)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS vector_files (
+                model TEXT NOT NULL, dim INTEGER NOT NULL, next_slot INTEGER NOT NULL,
+                PRIMARY KEY (model, dim)
+            )"""
+        )
+
+    def _file(self, model, dim):
+        if (model, dim) not in self.files:
+            safe = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+            path = os.path.join(self.vector_dir, f"{safe}_{dim}.f32")
+            self.files[(model, dim)] = VectorFile(path, dim)
+        return self.files[(model, dim)]
+
+    def get_many(self, model, dim, keys):
+        """Returns {key: vector} for the cached keys."""
+        found = {}
+        if not keys:
+            return found
+        now = time.time()
+        with self.lock:
+            vectors = self._file(model, dim)
+            with self.conn:
+                for key in set(keys):
+                    row = self.conn.execute(
+                        "SELECT slot FROM embeddings WHERE model = ? AND dim = ? AND key = ?", (model, dim, key)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    found[key] = vectors.read(row[0])
+                    self.conn.execute(
+                        "UPDATE embeddings SET last_access = ? WHERE model = ? AND dim = ? AND key = ?",
+                        (now, model, dim, key),
+                    )
+
+        with self.stats_lock:
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+        return found
+
+    def put_many(self, model, dim, items):
+        """Store {key: vector}; vectors of the wrong width are ignored."""
+        items = {k: v for k, v in items.items() if v is not None and len(v) == dim}
+        if not items:
+            return
+        now = time.time()
+        evicted = 0
+        with self.lock:
+            vectors = self._file(model, dim)
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key, vector in items.items():
+                    row = self.conn.execute(
+                        "SELECT slot FROM embeddings WHERE model = ? AND dim = ? AND key = ?", (model, dim, key)
+                    ).fetchone()
+                    slot = row[0] if row else self._allocate_slot(model, dim)
+                    vectors.write(slot, vector)
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO embeddings (model, dim, key, slot, last_access) VALUES (?, ?, ?, ?, ?)",
+                        (model, dim, key, slot, now),
+                    )
+                    self.stores += 1
+                    if self.stores % EMBED_CACHE_EVICT_EVERY == 0:
+                        evicted += self._evict(model, dim)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+        with self.stats_lock:
+            self.evictions += evicted
+
+    def _allocate_slot(self, model, dim):
+        row = self.conn.execute(
+            "SELECT slot FROM free_slots WHERE model = ? AND dim = ? LIMIT 1", (model, dim)
+        ).fetchone()
+        if row:
+            self.conn.execute(
+                "DELETE FROM free_slots WHERE model = ? AND dim = ? AND slot = ?", (model, dim, row[0])
+            )
+            return row[0]
+
+        row = self.conn.execute(
+            "SELECT next_slot FROM vector_files WHERE model = ? AND dim = ?", (model, dim)
+        ).fetchone()
+        slot = row[0] if row else 0
+        self.conn.execute(
+            "INSERT OR REPLACE INTO vector_files (model, dim, next_slot) VALUES (?, ?, ?)", (model, dim, slot + 1)
+        )
+        return slot
+
+    def _evict(self, model, dim):
+        count = self.conn.execute(
+            "SELECT COUNT(*) FROM embeddings WHERE model = ? AND dim = ?", (model, dim)
+        ).fetchone()[0]
+        if count <= self.max_entries:
+            return 0
+        excess = count - int(self.max_entries * EMBED_CACHE_EVICT_TO)
+        rows = self.conn.execute(
+            "SELECT key, slot FROM embeddings WHERE model = ? AND dim = ? ORDER BY last_access LIMIT ?",
+            (model, dim, excess),
+        ).fetchall()
+        self.conn.executemany(
+            "DELETE FROM embeddings WHERE model = ? AND dim = ? AND key = ?", [(model, dim, k) for k, _ in rows]
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO free_slots (model, dim, slot) VALUES (?, ?, ?)", [(model, dim, s) for _, s in rows]
+        )
+        return len(rows)
+
+    def flush(self):
+        with self.lock:
+            for vectors in self.files.values():
+                vectors.flush()
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        with self.stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries_per_model": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings wrapper that serves repeated texts from the
+    EmbeddingCache and sends only misses to the model, through the rate governor.
+    Query and document embeddings are cached separately (different task types).
+    """
+
+    def __init__(self, embeddings, cache, dimensions=EMBEDDING_DIMENSIONS):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.dimensions = dimensions
+        self.model_name = getattr(embeddings, "model_name", None) or type(embeddings).__name__
+
+    def _cache_model(self, kind):
+        return f"{self.model_name}:{kind}"
+
+    def _lookup(self, kind, texts):
+        keys = [text_key(text) for text in texts]
+        found = self.cache.get_many(self._cache_model(kind), self.dimensions, keys)
+        # One model call per distinct missing text
+        first_index = {}
+        for i, key in enumerate(keys):
+            if key not in found:
+                first_index.setdefault(key, i)
+        missing = sorted(first_index.values())
+        return keys, found, missing
+
+    def _merge(self, kind, keys, found, missing, computed):
+        fresh = {keys[i]: vector for i, vector in zip(missing, computed)}
+        self.cache.put_many(self._cache_model(kind), self.dimensions, fresh)
+        found = found | fresh
+        return [found.get(key) for key in keys]
+
+    def embed_documents(self, texts):
+        keys, found, missing = self._lookup("document", texts)
+        computed = []
+        if missing:
+            computed = governor.run(self, "embed", lambda: self.embeddings.embed_documents([texts[i] for i in missing]))
+        return self._merge("document", keys, found, missing, computed)
+
+    def embed_query(self, text):
+        keys, found, missing = self._lookup("query", [text])
+        computed = []
+        if missing:
+            computed = [governor.run(self, "embed", lambda: self.embeddings.embed_query(text))]
+        return self._merge("query", keys, found, missing, computed)[0]
+
+    async def aembed_documents(self, texts):
+        keys, found, missing = self._lookup("document", texts)
+        computed = []
+        if missing:
+            computed = await governor.arun(
+                self, "embed", lambda: self.embeddings.aembed_documents([texts[i] for i in missing])
+            )
+        return self._merge("document", keys, found, missing, computed)
+
+    async def aembed_query(self, text):
+        keys, found, missing = self._lookup("query", [text])
+        computed = []
+        if missing:
+            computed = [await governor.arun(self, "embed", lambda: self.embeddings.aembed_query(text))]
+        return self._merge("query", keys, found, missing, computed)[0]
+
+
+embedding_cache = EmbeddingCache()
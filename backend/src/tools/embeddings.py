@@ -0,0 +1,119 @@
+import asyncio
+import os
+import threading
+
+from langchain_google_vertexai import VertexAIEmbeddings
+
+from backend.auth.init_vertex import init_vertex_ai
+from backend.src.tools.embedding_cache import CachedEmbeddings, embedding_cache
+
+EMBEDDING_MODEL = "text-embedding-005"
+
+# Vertex allows up to 250 texts and 20k tokens per embedding request
+EMBED_BATCH_MAX_TEXTS = int(os.getenv("EMBED_BATCH_MAX_TEXTS", "100"))
+EMBED_BATCH_TOKEN_BUDGET = int(os.getenv("EMBED_BATCH_TOKEN_BUDGET", "15000"))
+EMBED_MAX_CONCURRENT_BATCHES = int(os.getenv("EMBED_MAX_CONCURRENT_BATCHES", "4"))
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_embedding_batches(texts, max_texts=EMBED_BATCH_MAX_TEXTS, token_budget=EMBED_BATCH_TOKEN_BUDGET):
+    """Group text indices into API-sized batches by count and estimated tokens."""
+    batches = []
+    current, current_tokens = [], 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (len(current) >= max_texts or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+_shared_embeddings = None
+_shared_lock = threading.Lock()
+
+
+def get_embedding_function():
+    """Process-wide cached, governed embedding function shared by every caller."""
+    global _shared_embeddings
+    with _shared_lock:
+        if _shared_embeddings is None:
+            init_vertex_ai()
+            _shared_embeddings = CachedEmbeddings(VertexAIEmbeddings(model_name=EMBEDDING_MODEL), embedding_cache)
+        return _shared_embeddings
+
+
+def valid_vector(vector) -> bool:
+    return bool(vector) and isinstance(vector, list)
+
+
+class EmbeddingPipeline:
+    """
+    Embeds many documents in API-sized batches, a few batches at a time.
+    Meant for the shared CachedEmbeddings, which skips cached texts and throttles the rest.
+    A batch that still fails after the governor's retries is split and its
+    texts embedded one by one, so only the failing documents are reported.
+    """
+
+    def __init__(self, embedding_function, max_concurrent_batches=EMBED_MAX_CONCURRENT_BATCHES):
+        self.embedding_function = embedding_function
+        self.max_concurrent_batches = max_concurrent_batches
+
+    async def _embed(self, texts):
+        # Cache lookups and the rate governor live in the embedding function
+        return await self.embedding_function.aembed_documents(texts)
+
+    async def embed_documents(self, texts):
+        """
+        Returns (vectors, errors): `vectors[i]` is the embedding of `texts[i]`
+        or None, and `errors` maps the index of every failed text to a message.
+        """
+        vectors = [None] * len(texts)
+        errors = {}
+        slots = asyncio.Semaphore(self.max_concurrent_batches)
+
+        async def embed_one(index):
+            try:
+                result = await self._embed([texts[index]])
+                vector = result[0] if result else None
+            except Exception as e:
+                errors[index] = str(e)
+                return
+            if valid_vector(vector):
+                vectors[index] = vector
+            else:
+                errors[index] = "invalid embedding returned"
+
+        async def embed_batch(indices):
+            async with slots:
+                try:
+                    result = await self._embed([texts[i] for i in indices])
+                except Exception as e:
+                    print(f"⚠️ Embedding batch of {len(indices)} failed ({e}), retrying items individually")
+                    result = None
+
+                if result is not None and len(result) == len(indices):
+                    retry = []
+                    for index, vector in zip(indices, result):
+                        if valid_vector(vector):
+                            vectors[index] = vector
+                        else:
+                            retry.append(index)
+                else:
+                    retry = indices
+
+                for index in retry:
+                    await embed_one(index)
+
+        batches = pack_embedding_batches(texts)
+        print(f"🧮 Embedding {len(texts)} documents in {len(batches)} batch(es)")
+        await asyncio.gather(*[embed_batch(indices) for indices in batches])
+        return vectors, errors
@@ -0,0 +1,230 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+from backend.src.tools.enrichment_cache import enrichment_cache
+from backend.src.utils.rate_governor import governor
+
+# "batched" packs several chunks into one Gemini call, "single" makes one call per chunk
+ENRICH_MODE = os.getenv("ENRICH_MODE", "batched")
+ENRICH_BATCH_MAX_CHUNKS = int(os.getenv("ENRICH_BATCH_MAX_CHUNKS", "8"))
+ENRICH_BATCH_TOKEN_BUDGET = int(os.getenv("ENRICH_BATCH_TOKEN_BUDGET", "12000"))
+ENRICH_BATCH_RETRIES = int(os.getenv("ENRICH_BATCH_RETRIES", "1"))
+
+# Bump whenever the prompts or schema change so cached metadata is regenerated
+ENRICH_PROMPT_VERSION = "v2"
+
+# Rough chars-per-token ratio for English legal text
+CHARS_PER_TOKEN = 4
+REQUIRED_FIELDS = ("policy_type", "summary")
+
+SYSTEM_PROMPT = '''You are a policy analyzer that generates structured metadata for pre-chunked legal content (e.g., Terms of Service, Privacy Policies). Your output will be used for semantic retrieval, privacy risk detection, and clause-level reasoning in downstream AI applications.'''
+
+single_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", '''Given the following policy text, generate a **JSON object** that includes structured metadata fields.
+
+    Use this schema (remove any fields with None values):
+    - "domain": {url}.
+    - "scrape_date": {timestamp}
+    - "language": Detected language (e.g., "en").
+    - "policy_type": One of: "privacy_policy", "terms_of_service", "cookie_policy", "acceptable_use", "other"
+    - "risk_tags": comma-separated privacy/legal risks (e.g., "data_sharing, location_tracking")
+    - "section_title": Descriptive title for this chunk (infer if not present)
+    - "summary": A 1–2 sentence plain-English summary
+    - "categories": comma-separated topics (e.g., "data_collection", "user_rights")
+    - "user_impact_level": One of "low", "medium", "high" based on user impact
+
+    Return only one valid JSON object. No markdown, no explanation.
+
+    Policy Text:
+    """
+    {data}
+    """''')
+])
+
+batch_prompt = ChatPromptTemplate.from_messages([
+    ("system", SYSTEM_PROMPT),
+    ("human", '''Each policy text chunk below starts with a line "### CHUNK <n>". For every chunk, generate a JSON object with structured metadata fields.
+
+    Use this schema for each object (remove any fields with None values):
+    - "chunk_index": The <n> of the chunk the object describes.
+    - "language": Detected language (e.g., "en").
+    - "policy_type": One of: "privacy_policy", "terms_of_service", "cookie_policy", "acceptable_use", "other"
+    - "risk_tags": comma-separated privacy/legal risks (e.g., "data_sharing, location_tracking")
+    - "section_title": Descriptive title for this chunk (infer if not present)
+    - "summary": A 1–2 sentence plain-English summary
+    - "categories": comma-separated topics (e.g., "data_collection", "user_rights")
+    - "user_impact_level": One of "low", "medium", "high" based on user impact
+
+    Return only one valid JSON array with exactly one object per chunk ({count} objects). No markdown, no explanation.
+
+    Policy Text Chunks:
+    """
+    {data}
+    """''')
+])
+
+
+def utc_timestamp():
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_batches(chunks, max_chunks=ENRICH_BATCH_MAX_CHUNKS, token_budget=ENRICH_BATCH_TOKEN_BUDGET):
+    """Group chunk indices into batches bounded by count and estimated prompt tokens."""
+    batches = []
+    current, current_tokens = [], 0
+    for index, chunk in enumerate(chunks):
+        tokens = estimate_tokens(chunk.page_content)
+        if current and (len(current) >= max_chunks or current_tokens + tokens > token_budget):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def validate_batch_response(response, indices):
+    """
+    Map chunk index -> metadata for every well-formed item in a batch reply.
+    Items with unknown indices or missing required fields are dropped, so
+    their chunks count as missing and get retried.
+    """
+    if isinstance(response, dict):
+        # Tolerate {"chunks": [...]} style wrappers
+        response = next((v for v in response.values() if isinstance(v, list)), [response])
+    if not isinstance(response, list):
+        return {}
+
+    wanted = set(indices)
+    results = {}
+    for item in response:
+        if not isinstance(item, dict):
+            continue
+        try:
+            index = int(item.get("chunk_index"))
+        except (TypeError, ValueError):
+            continue
+        if index not in wanted or not all(item.get(field) for field in REQUIRED_FIELDS):
+            continue
+        metadata = {k: v for k, v in item.items() if k != "chunk_index"}
+        results[index] = metadata
+    return results
+
+
+class MetadataEnricher:
+    """Adds Gemini-generated metadata to policy chunks, one call per chunk or per batch."""
+
+    def __init__(self, llm, mode=ENRICH_MODE, cache=enrichment_cache):
+        self.llm = llm
+        self.mode = mode
+        self.cache = cache
+        self.single_chain = single_prompt | llm | JsonOutputParser()
+        self.batch_chain = batch_prompt | llm | JsonOutputParser()
+        self.calls = 0
+
+    async def enrich_single(self, chunk, company_url):
+        inputs = {
+            "data": chunk.page_content,
+            "url": company_url,
+            "timestamp": utc_timestamp()
+        }
+        self.calls += 1
+        try:
+            response = await governor.arun(self.llm, "generate", lambda: self.single_chain.ainvoke(inputs))
+            # The domain must match the query filter exactly, whatever the model echoed
+            chunk.metadata = chunk.metadata | response | {"domain": company_url}
+            return True
+        except Exception as e:
+            print(f"❌ Metadata generation failed for chunk: {e}")
+            return False
+
+    async def enrich_batch(self, chunks, indices, company_url, retries=ENRICH_BATCH_RETRIES):
+        data = "\n\n".join(f"### CHUNK {i}\n{chunks[i].page_content}" for i in indices)
+        inputs = {"data": data, "count": len(indices)}
+
+        self.calls += 1
+        try:
+            response = await governor.arun(self.llm, "generate", lambda: self.batch_chain.ainvoke(inputs))
+            results = validate_batch_response(response, indices)
+        except Exception as e:
+            print(f"❌ Batched metadata generation failed for chunks {indices}: {e}")
+            results = {}
+
+        timestamp = utc_timestamp()
+        for index, metadata in results.items():
+            chunks[index].metadata = chunks[index].metadata | metadata | {
+                "domain": company_url,
+                "scrape_date": timestamp,
+            }
+
+        missing = [i for i in indices if i not in results]
+        if not missing:
+            return
+
+        if retries > 0 and len(missing) > 1:
+            print(f"🔁 Retrying {len(missing)} chunk(s) missing from a batch reply")
+            await self.enrich_batch(chunks, missing, company_url, retries - 1)
+        else:
+            await asyncio.gather(*[
+                self.enrich_single(chunks[i], company_url) for i in missing
+            ])
+
+    def apply_cached(self, chunks, company_url):
+        """Overlay cached metadata where available; returns the chunks still to enrich."""
+        if self.cache is None:
+            return chunks
+
+        timestamp = utc_timestamp()
+        missing = []
+        for chunk in chunks:
+            cached = self.cache.get(chunk.page_content, ENRICH_PROMPT_VERSION)
+            if cached is None:
+                missing.append(chunk)
+                continue
+            chunk.metadata = chunk.metadata | cached | {
+                "domain": company_url,
+                "scrape_date": timestamp,
+            }
+        return missing
+
+    def store_results(self, chunks):
+        if self.cache is None:
+            return
+        for chunk in chunks:
+            if all(chunk.metadata.get(field) for field in REQUIRED_FIELDS):
+                self.cache.put(chunk.page_content, ENRICH_PROMPT_VERSION, chunk.metadata)
+
+    async def enrich(self, chunks, company_url):
+        pending = self.apply_cached(chunks, company_url)
+        if len(pending) < len(chunks):
+            print(f"🗃️ Enrichment cache covered {len(chunks) - len(pending)} of {len(chunks)} chunks")
+
+        if not pending:
+            return chunks
+
+        if self.mode == "single":
+            await asyncio.gather(*[self.enrich_single(chunk, company_url) for chunk in pending])
+        else:
+            batches = pack_batches(pending)
+            print(f"📦 Enriching {len(pending)} chunks in {len(batches)} batched call(s)")
+            await asyncio.gather(*[
+                self.enrich_batch(pending, indices, company_url) for indices in batches
+            ])
+
+        self.store_results(pending)
+        print(f"🧾 Metadata enrichment used {self.calls} LLM call(s) for {len(pending)} chunks")
+
+        unenriched = sum(1 for chunk in pending if not chunk.metadata.get("summary"))
+        if unenriched:
+            print(f"⚠️ {unenriched} chunk(s) left without metadata after retries")
+        return chunks
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+
+from backend.src.tools.page_fetcher import normalized_text_hash
+from backend.src.utils.storage import SQLiteStore
+
+ENRICH_CACHE_MAX_ENTRIES = int(os.getenv("ENRICH_CACHE_MAX_ENTRIES", "50000"))
+# Evict down to this share of the limit, checking every few inserts
+ENRICH_CACHE_EVICT_TO = 0.9
+ENRICH_CACHE_EVICT_EVERY = 100
+
+# Fields that belong to the document the chunk was scraped from, not to its text
+PER_DOCUMENT_FIELDS = ("domain", "scrape_date", "source")
+
+
+class EnrichmentCache(SQLiteStore):
+    """
+    Persistent cache of chunk metadata keyed by normalized chunk-text hash and
+    prompt version, so boilerplate shared across domains is enriched once.
+    Least recently used entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, path=None, max_entries=ENRICH_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        super().__init__("enrichment.sqlite", path)
+
+    def setup(self, conn):
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS enrichment_cache (
+                text_hash TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (text_hash, prompt_version)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS enrichment_lru ON enrichment_cache (last_access)")
+
+    def get(self, text: str, prompt_version: str):
+        key = (normalized_text_hash(text), prompt_version)
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT metadata FROM enrichment_cache WHERE text_hash = ? AND prompt_version = ?", key
+            ).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE enrichment_cache SET last_access = ? WHERE text_hash = ? AND prompt_version = ?",
+                    (time.time(), *key),
+                )
+
+        with self.stats_lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, text: str, prompt_version: str, metadata: dict):
+        metadata = {k: v for k, v in metadata.items() if k not in PER_DOCUMENT_FIELDS}
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO enrichment_cache
+                   (text_hash, prompt_version, metadata, last_access) VALUES (?, ?, ?, ?)""",
+                (normalized_text_hash(text), prompt_version, json.dumps(metadata), time.time()),
+            )
+            self.stores += 1
+            evicted = self._evict() if self.stores % ENRICH_CACHE_EVICT_EVERY == 0 else 0
+
+        with self.stats_lock:
+            self.evictions += evicted
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+        if count <= self.max_entries:
+            return 0
+        excess = count - int(self.max_entries * ENRICH_CACHE_EVICT_TO)
+        self.conn.execute(
+            """DELETE FROM enrichment_cache WHERE rowid IN (
+                SELECT rowid FROM enrichment_cache ORDER BY last_access LIMIT ?
+            )""",
+            (excess,),
+        )
+        return excess
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM enrichment_cache").fetchone()[0]
+        with self.stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+enrichment_cache = EnrichmentCache()
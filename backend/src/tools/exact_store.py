@@ -0,0 +1,344 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+
+from backend.src.tools.quantization import (
+    SCAN_DTYPES, dequantize, normalize_rows, quantize, scan_scores, truncate_dimensions
+)
+from backend.src.utils.storage import data_warehouse_path
+
+# "chroma" serves queries through Chroma's ANN index, "exact" through ExactStore
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+# Scan matrix dtype ("float32", "float16" or "int8") and width (0 keeps all dimensions)
+EXACT_STORE_DTYPE = os.getenv("EXACT_STORE_DTYPE", "float32")
+EXACT_STORE_DIMENSIONS = int(os.getenv("EXACT_STORE_DIMENSIONS", "0"))
+# With a lossy scan matrix, keep float32 originals and rescore the top k * oversample
+EXACT_RESCORE = os.getenv("EXACT_RESCORE", "true").lower() == "true"
+EXACT_RESCORE_OVERSAMPLE = int(os.getenv("EXACT_RESCORE_OVERSAMPLE", "4"))
+
+META_FILE = "meta.json"
+
+
+def matches(metadata, where):
+    """Flat equality filter, the subset of Chroma's `where` the app uses."""
+    return not where or all(metadata.get(key) == value for key, value in where.items())
+
+
+class PartitionSnapshot:
+    """Immutable view of one partition: the mapped matrices plus the sidecar rows."""
+
+    def __init__(self, vectors=None, scales=None, full=None, ids=(), documents=(), metadatas=(), version=None):
+        self.vectors = vectors
+        self.scales = scales
+        self.full = full
+        self.ids = list(ids)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.version = version
+        self.rows = {chunk_id: row for row, chunk_id in enumerate(self.ids)}
+
+    def original(self, rows):
+        """Best available float32 vectors for `rows`: the originals if kept, else decoded scan rows."""
+        if self.full is not None:
+            return np.asarray(self.full[rows], dtype=np.float32)
+        scales = None if self.scales is None else self.scales[rows]
+        return dequantize(self.vectors[rows], scales)
+
+    def files(self):
+        return [getattr(a, "filename", None) for a in (self.vectors, self.scales, self.full) if a is not None]
+
+
+class PartitionReader:
+    """
+    Read side of the collection-style API used by VectorStoreManager, over
+    whatever PartitionSnapshot `load()` returns.
+    """
+
+    oversample = EXACT_RESCORE_OVERSAMPLE
+
+    def load(self):
+        raise NotImplementedError
+
+    def count(self):
+        return len(self.load().ids)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas"), limit=None, offset=0):
+        snapshot = self.load()
+        if ids is not None:
+            rows = [snapshot.rows[i] for i in ids if i in snapshot.rows]
+        else:
+            rows = [row for row, metadata in enumerate(snapshot.metadatas) if matches(metadata, where)]
+        rows = rows[offset:offset + limit if limit else None]
+
+        result = {"ids": [snapshot.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [snapshot.documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [snapshot.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = list(snapshot.original(rows)) if rows else []
+        return result
+
+    def search(self, query_vector, k=3, where=None):
+        """[(Document, cosine similarity)] for the k best rows matching `where`."""
+        snapshot = self.load()
+        if snapshot.vectors is None:
+            return []
+
+        query = normalize_rows(query_vector)
+        scan_query = truncate_dimensions(query, snapshot.vectors.shape[-1])
+        scores = scan_scores(snapshot.vectors, snapshot.scales, scan_query)
+        if where:
+            mask = np.fromiter((matches(m, where) for m in snapshot.metadatas), dtype=bool, count=len(snapshot.ids))
+            scores = np.where(mask, scores, -np.inf)
+
+        available = int(np.isfinite(scores).sum())
+        k = min(k, available)
+        if k <= 0:
+            return []
+
+        if snapshot.full is not None:
+            # Rescore the oversampled candidates against the float32 originals
+            candidates = min(available, k * self.oversample)
+            # Sorted rows read the mapped file front to back
+            top = np.sort(np.argpartition(-scores, candidates - 1)[:candidates])
+            scores = np.full(len(snapshot.ids), -np.inf, dtype=np.float32)
+            scores[top] = np.asarray(snapshot.full[top], dtype=np.float32) @ query
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            (Document(id=snapshot.ids[row], page_content=snapshot.documents[row],
+                      metadata=snapshot.metadatas[row]), float(scores[row]))
+            for row in top
+        ]
+
+
+class ExactPartition(PartitionReader):
+    """
+    One domain's chunks: L2-normalized embeddings in a contiguous .npy scan
+    matrix opened with mmap, and ids, documents and metadata in a JSON sidecar.
+
+    The scan matrix can be truncated to fewer dimensions and stored as
+    float16 or int8 (per-row scales). When that is lossy and rescoring is on,
+    the float32 originals are kept in a second mapped file that only the
+    oversampled top candidates are read from.
+
+    Writes rebuild the (small) partition into new files and then swap
+    meta.json, which names the live generation, so readers in this or another
+    process always see a consistent set. Top-k is one matrix-vector product.
+    """
+
+    def __init__(self, path, dtype=EXACT_STORE_DTYPE, dims=EXACT_STORE_DIMENSIONS, rescore=EXACT_RESCORE,
+                 oversample=EXACT_RESCORE_OVERSAMPLE):
+        if dtype not in SCAN_DTYPES:
+            raise ValueError(f"Unsupported exact store dtype {dtype!r}, expected one of {SCAN_DTYPES}")
+        self.path = path
+        self.dtype = dtype
+        self.dims = dims
+        self.rescore = rescore
+        self.oversample = max(1, oversample)
+        self.lock = threading.Lock()
+        # Serializes read-modify-write cycles within this process
+        self.write_lock = threading.Lock()
+        self.snapshot = PartitionSnapshot()
+        self.meta_mtime = None
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.path, META_FILE)
+
+    def exists(self):
+        return os.path.exists(self.meta_path)
+
+    def _map(self, name):
+        return np.load(os.path.join(self.path, name), mmap_mode="r") if name else None
+
+    def load(self):
+        """Current snapshot, re-reading it if another writer replaced meta.json."""
+        try:
+            st = os.stat(self.meta_path)
+        except FileNotFoundError:
+            return self.snapshot
+        # os.replace gives every write a new inode, even within one mtime tick
+        mtime = (st.st_ino, st.st_mtime_ns)
+        if mtime == self.meta_mtime:
+            return self.snapshot
+
+        with self.lock:
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            files = meta.get("files", {})
+            if meta["ids"]:
+                self.snapshot = PartitionSnapshot(
+                    self._map(files.get("vectors")), self._map(files.get("scales")), self._map(files.get("full")),
+                    meta["ids"], meta["documents"], meta["metadatas"], meta["generation"],
+                )
+            else:
+                self.snapshot = PartitionSnapshot(version=meta["generation"])
+            self.meta_mtime = mtime
+        return self.snapshot
+
+    def lossy(self, width):
+        return self.dtype != "float32" or bool(self.dims and self.dims < width)
+
+    def _write(self, ids, documents, metadatas, vectors):
+        os.makedirs(self.path, exist_ok=True)
+        old = self.snapshot.files()
+        generation = uuid.uuid4().hex[:12]
+        files = {}
+        if ids:
+            full = normalize_rows(vectors)
+            codes, scales = quantize(truncate_dimensions(full, self.dims), self.dtype)
+            arrays = {"vectors": codes, "scales": scales}
+            if self.rescore and self.lossy(full.shape[-1]):
+                arrays["full"] = full
+            for kind, array in arrays.items():
+                if array is not None:
+                    files[kind] = f"{generation}.{kind}.npy"
+                    np.save(os.path.join(self.path, files[kind]), array)
+
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "generation": generation,
+                "dtype": self.dtype,
+                "dims": self.dims,
+                "files": files,
+                "ids": ids,
+                "documents": documents,
+                "metadatas": metadatas,
+            }, f)
+        os.replace(tmp, self.meta_path)
+
+        for path in old:
+            # Open maps keep an unlinked file readable until they are dropped
+            try:
+                os.remove(path)
+            except (FileNotFoundError, TypeError):
+                pass
+        self.meta_mtime = None
+
+    def _rows(self, snapshot):
+        if not snapshot.ids:
+            return {}
+        vectors = snapshot.original(np.arange(len(snapshot.ids)))
+        return {
+            chunk_id: (snapshot.documents[row], snapshot.metadatas[row], vectors[row])
+            for row, chunk_id in enumerate(snapshot.ids)
+        }
+
+    def _commit(self, rows):
+        ids = list(rows)
+        self._write(
+            ids,
+            [rows[i][0] for i in ids],
+            [rows[i][1] for i in ids],
+            [rows[i][2] for i in ids],
+        )
+        return self.load()
+
+    # Write side of the collection-style API used by VectorStoreManager.vectordb_add
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        vectors = normalize_rows(embeddings)
+        with self.write_lock:
+            rows = self._rows(self.load())
+            for chunk_id, document, metadata, vector in zip(ids, documents, metadatas, vectors):
+                rows[chunk_id] = (document, metadata, vector)
+            dims = {len(vector) for _, _, vector in rows.values()}
+            if len(dims) > 1:
+                # Stored rows were truncated without keeping originals; match their width
+                width = min(dims)
+                print(f"⚠️ Truncating new vectors in {self.path} to the stored width {width}")
+                rows = {
+                    chunk_id: (document, metadata, truncate_dimensions(vector, width))
+                    for chunk_id, (document, metadata, vector) in rows.items()
+                }
+            self._commit(rows)
+
+    def delete(self, ids):
+        with self.write_lock:
+            rows = self._rows(self.load())
+            for chunk_id in ids:
+                rows.pop(chunk_id, None)
+            self._commit(rows)
+
+
+class ExactStore:
+    """
+    Process-wide registry of ExactPartitions under data_warehouse/exact/<vectordb_name>/.
+
+    A read-only base layer (a prebuilt VectorSnapshot) can be attached: its
+    partitions serve reads until the first write to one of them, which seeds
+    a local partition from the snapshot copy that then takes precedence.
+    """
+
+    def __init__(self, dtype=EXACT_STORE_DTYPE, dims=EXACT_STORE_DIMENSIONS, rescore=EXACT_RESCORE):
+        self.dtype = dtype
+        self.dims = dims
+        self.rescore = rescore
+        self._lock = threading.Lock()
+        self._partitions = {}
+        self.base = None
+
+    def attach(self, base):
+        self.base = base
+
+    def root(self, vectordb_name="vectorDB"):
+        return data_warehouse_path("exact", vectordb_name)
+
+    def collection(self, name="vectorDB", vectordb_name=None, create=True):
+        vectordb_name = vectordb_name or name
+        key = (vectordb_name, name)
+        with self._lock:
+            partition = self._partitions.get(key)
+            if partition is None:
+                partition = ExactPartition(
+                    os.path.join(self.root(vectordb_name), name), self.dtype, self.dims, self.rescore
+                )
+                self._partitions[key] = partition
+        if not partition.exists() and self.base is not None and self.base.has(name, vectordb_name):
+            if not create:
+                return self.base.partition(name, vectordb_name)
+            self.base.seed(name, vectordb_name, partition)
+        if not create and not partition.exists():
+            return None
+        return partition
+
+    def collection_names(self, vectordb_name="vectorDB"):
+        root = self.root(vectordb_name)
+        names = []
+        if os.path.isdir(root):
+            names = [name for name in os.listdir(root) if os.path.exists(os.path.join(root, name, META_FILE))]
+        if self.base is not None:
+            names.extend(name for name in self.base.names(vectordb_name) if name not in names)
+        return names
+
+    def drop(self, name, vectordb_name="vectorDB"):
+        with self._lock:
+            self._partitions.pop((vectordb_name, name), None)
+        shutil.rmtree(os.path.join(self.root(vectordb_name), name), ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            partitions = list(self._partitions.values())
+        loaded = [p.snapshot for p in partitions if p.snapshot.vectors is not None]
+        return {
+            "backend": VECTOR_BACKEND,
+            "dtype": self.dtype,
+            "dimensions": self.dims or "full",
+            "rescore": self.rescore,
+            "partitions_loaded": len(loaded),
+            "rows_loaded": sum(len(s.ids) for s in loaded),
+            "scan_bytes": sum(s.vectors.nbytes + (0 if s.scales is None else s.scales.nbytes) for s in loaded),
+            "rescore_bytes": sum(0 if s.full is None else s.full.nbytes for s in loaded),
+        }
+
+
+exact_store = ExactStore()
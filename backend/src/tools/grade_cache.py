@@ -0,0 +1,208 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from backend.src.tools.page_fetcher import normalized_text_hash
+from backend.src.utils.storage import SQLiteStore
+
+GRADE_CACHE = os.getenv("GRADE_CACHE", "true").lower() == "true"
+GRADE_CACHE_MAX_ENTRIES = int(os.getenv("GRADE_CACHE_MAX_ENTRIES", "20000"))
+# "true" keeps grades in data_warehouse/cache/grades.sqlite, shared by every worker process
+GRADE_CACHE_SHARED = os.getenv("GRADE_CACHE_SHARED", "false").lower() == "true"
+# Evict down to this share of the limit, checking every few inserts
+GRADE_CACHE_EVICT_TO = 0.9
+GRADE_CACHE_EVICT_EVERY = 100
+
+# Punctuation, symbols and underscores in any script; letters and digits are kept
+QUERY_NOISE = re.compile(r"[\W_]+")
+
+
+def query_hash(query: str) -> str:
+    """Hash of the query with Unicode form, case, punctuation and spacing normalized away."""
+    folded = unicodedata.normalize("NFKC", query).casefold()
+    normalized = " ".join(QUERY_NOISE.sub(" ", folded).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class MemoryGradeStore:
+    """Bounded in-process LRU of grades, with a per-domain index for invalidation."""
+
+    def __init__(self, max_entries=GRADE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.by_domain = {}
+        self.evictions = 0
+
+    def get_many(self, keys):
+        with self.lock:
+            found = {}
+            for key in keys:
+                if key in self.entries:
+                    self.entries.move_to_end(key)
+                    found[key] = self.entries[key][0]
+            return found
+
+    def put_many(self, rows):
+        with self.lock:
+            for key, score, domain in rows:
+                if key in self.entries:
+                    self.by_domain.get(self.entries[key][1], set()).discard(key)
+                self.entries[key] = (score, domain)
+                self.entries.move_to_end(key)
+                self.by_domain.setdefault(domain, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                key, (_, domain) = self.entries.popitem(last=False)
+                self.by_domain.get(domain, set()).discard(key)
+                self.evictions += 1
+
+    def invalidate(self, domain):
+        with self.lock:
+            keys = self.by_domain.pop(domain, set())
+            for key in keys:
+                self.entries.pop(key, None)
+            return len(keys)
+
+    def count(self):
+        with self.lock:
+            return len(self.entries)
+
+
+class SQLiteGradeStore(SQLiteStore):
+    """The same store in SQLite, so worker processes share grades; least recently used rows are evicted."""
+
+    def __init__(self, path=None, max_entries=GRADE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.stores = 0
+        self.evictions = 0
+        super().__init__("grades.sqlite", path)
+
+    def setup(self, conn):
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS grades (
+                query_hash TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                grader_version TEXT NOT NULL,
+                domain TEXT,
+                score REAL NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (query_hash, chunk_hash, grader_version)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS grades_lru ON grades (last_access)")
+        conn.execute("CREATE INDEX IF NOT EXISTS grades_domain ON grades (domain)")
+
+    def get_many(self, keys):
+        found = {}
+        now = time.time()
+        with self.lock, self.conn:
+            for key in keys:
+                row = self.conn.execute(
+                    "SELECT score FROM grades WHERE query_hash = ? AND chunk_hash = ? AND grader_version = ?", key
+                ).fetchone()
+                if row:
+                    found[key] = row[0]
+                    self.conn.execute(
+                        """UPDATE grades SET last_access = ?
+                           WHERE query_hash = ? AND chunk_hash = ? AND grader_version = ?""",
+                        (now, *key),
+                    )
+        return found
+
+    def put_many(self, rows):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.executemany(
+                """INSERT OR REPLACE INTO grades
+                   (query_hash, chunk_hash, grader_version, domain, score, last_access) VALUES (?, ?, ?, ?, ?, ?)""",
+                [(*key, domain, score, now) for key, score, domain in rows],
+            )
+            before = self.stores
+            self.stores += len(rows)
+            if self.stores // GRADE_CACHE_EVICT_EVERY != before // GRADE_CACHE_EVICT_EVERY:
+                self.evictions += self._evict()
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+        if count <= self.max_entries:
+            return 0
+        excess = count - int(self.max_entries * GRADE_CACHE_EVICT_TO)
+        self.conn.execute(
+            "DELETE FROM grades WHERE rowid IN (SELECT rowid FROM grades ORDER BY last_access LIMIT ?)", (excess,)
+        )
+        return excess
+
+    def invalidate(self, domain):
+        with self.lock, self.conn:
+            return self.conn.execute("DELETE FROM grades WHERE domain = ?", (domain,)).rowcount
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM grades").fetchone()[0]
+
+
+class GradeCache:
+    """
+    Grader outputs keyed by normalized query hash, chunk text hash and
+    grader version, so the same question about the same site is graded
+    once. Each entry remembers its chunk's domain and is dropped when that
+    domain's chunks are re-ingested.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or (SQLiteGradeStore() if GRADE_CACHE_SHARED else MemoryGradeStore())
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def keys(self, query, texts, grader_version):
+        query_key = query_hash(query)
+        return [(query_key, normalized_text_hash(text), grader_version) for text in texts]
+
+    def get(self, query, texts, grader_version):
+        """Cached score per text, None where missing."""
+        if not GRADE_CACHE:
+            return [None] * len(texts)
+        keys = self.keys(query, texts, grader_version)
+        found = self.store.get_many(keys)
+        with self.stats_lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return [found.get(key) for key in keys]
+
+    def put(self, query, texts, scores, domains, grader_version):
+        if GRADE_CACHE and texts:
+            keys = self.keys(query, texts, grader_version)
+            self.store.put_many(list(zip(keys, scores, domains)))
+
+    def invalidate(self, domain):
+        removed = self.store.invalidate(domain)
+        with self.stats_lock:
+            self.invalidations += 1
+        if removed:
+            print(f"🧽 Dropped {removed} cached grade(s) for {domain}")
+        return removed
+
+    def stats(self):
+        entries = self.store.count()
+        with self.stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": GRADE_CACHE,
+                "shared": isinstance(self.store, SQLiteGradeStore),
+                "entries": entries,
+                "max_entries": self.store.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.store.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+grade_cache = GradeCache()
@@ -1,20 +1,114 @@
+import asyncio
+import hashlib
+import os
+import threading
+
 import numpy as np
+from langchain_core.exceptions import OutputParserException
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
 from backend.auth.init_vertex import init_vertex_ai
-from langchain_google_vertexai import VertexAIEmbeddings, ChatVertexAI
+from langchain_google_vertexai import ChatVertexAI
+from backend.src.utils.rate_governor import governor
+from backend.src.tools.embeddings import EMBEDDING_MODEL, get_embedding_function
+from backend.src.tools.grade_cache import grade_cache
+from backend.src.tools.lexical_index import tokenize
+from backend.src.tools.retrieval_result import RetrievalResult
+
+# Chunks scoring below GRADER_MIN_SCORE are dropped from graded retrieval; the rest are ordered best first
+GRADER_MIN_SCORE = float(os.getenv("GRADER_MIN_SCORE", "0"))
+GRADER_REORDER = os.getenv("GRADER_REORDER", "true").lower() == "true"
+
+# Tiered grading: a cheap score (similarity blended with query-term overlap) at or
+# above GRADER_ACCEPT_SCORE or at or below GRADER_REJECT_SCORE decides a chunk; only
+# the band in between goes to the LLM judge. The thresholds come from
+# benchmarks/grader_calibration.py against the production embedding model; the
+# defaults sit outside the score range, so until calibrated values are set every
+# chunk goes to the judge, exactly as without tiering.
+GRADER_TIERED = os.getenv("GRADER_TIERED", "true").lower() == "true"
+GRADER_ACCEPT_SCORE = float(os.getenv("GRADER_ACCEPT_SCORE", "1.01"))
+GRADER_REJECT_SCORE = float(os.getenv("GRADER_REJECT_SCORE", "-1.01"))
+GRADER_LEXICAL_WEIGHT = float(os.getenv("GRADER_LEXICAL_WEIGHT", "0.3"))
+
+RATINGS = ("relevance", "completeness", "faithfulness")
+SIMILARITY_WEIGHT = 0.4
+RATING_WEIGHTS = (0.3, 0.15, 0.15)
+# Ratings a cheap-tier decision stands for (the judge's 5/5 and 1/5 on the 0-1 scale),
+# so decided chunks get composite scores on the same scale as judged ones
+ACCEPT_RATING = (1.0, 1.0, 1.0)
+REJECT_RATING = (0.2, 0.2, 0.2)
+
+GRADE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "Evaluate each numbered chunk, on its own, for how well it answers the user query."),
+    ("human", '''
+    Return only one valid JSON object. Do not include any explanation, markdown, or formatting. Your entire response should be a single JSON object.
+
+    Query:
+    {query}
+
+    Chunks:
+    {chunks}
+
+    Rate each of the {count} chunks from 1 to 5:
+    - relevance
+    - completeness
+    - faithfulness
+
+    Respond with a JSON object **in this exact format**, with one entry per chunk in the order given:
+
+    {{
+      "scores": [
+        {{"chunk": 1, "relevance": 5, "completeness": 4, "faithfulness": 5}},
+        {{"chunk": 2, "relevance": 2, "completeness": 1, "faithfulness": 4}}
+      ]
+    }}
+    ''')
+])
+
+# Cached grades are only reused by the grader that produced them: the version
+# changes with the prompt, the weights, the tier thresholds, the judge model or
+# the embedding model behind the cosine similarity in every score
+GRADER_MODEL = "gemini-2.0-flash-lite"
+GRADER_VERSION = hashlib.sha256(repr((
+    GRADE_PROMPT.pretty_repr(), SIMILARITY_WEIGHT, RATING_WEIGHTS, GRADER_TIERED,
+    GRADER_ACCEPT_SCORE, GRADER_REJECT_SCORE, GRADER_LEXICAL_WEIGHT, ACCEPT_RATING, REJECT_RATING,
+    GRADER_MODEL, EMBEDDING_MODEL,
+)).encode("utf-8")).hexdigest()[:12]
+
+
+def term_overlap(query_terms, text):
+    """Share of the query's terms that occur in `text`; None for a query without terms."""
+    if not query_terms:
+        return None
+    return len(query_terms & set(tokenize(text))) / len(query_terms)
+
+
+def cheap_score(similarity, query_terms, text, lexical_weight=GRADER_LEXICAL_WEIGHT):
+    """First-tier score: cosine similarity blended with term overlap, whichever of the two exist."""
+    overlap = term_overlap(query_terms, text)
+    if similarity is None or not np.isfinite(similarity):
+        return overlap
+    if overlap is None:
+        return float(similarity)
+    return (1 - lexical_weight) * float(similarity) + lexical_weight * overlap
 
 
 class Grader:
     def __init__(self):
         init_vertex_ai()
-        self.embedding_function = VertexAIEmbeddings(model_name="text-embedding-005")
+        self.embedding_function = get_embedding_function()
         self.llm = ChatVertexAI(
-            model="gemini-2.0-flash-lite",
+            model=GRADER_MODEL,
             temperature=0.8,
             max_output_tokens=600
         )
+        # One call rates every retrieved chunk
+        self.chain = GRADE_PROMPT | self.llm | JsonOutputParser()
+        self.stats_lock = threading.Lock()
+        self.tiers = {"cached": 0, "accepted": 0, "rejected": 0, "judged": 0}
+        self.queries = 0
+        self.llm_calls = 0
 
     def batch_cosine_similarity(self, query_vec, doc_vecs):
         query_vec = np.array(query_vec)
@@ -36,78 +130,203 @@ class Grader:
 
         return average_score
 
-    def CompositeGrader(self, chunks, query):
+    def similarities(self, chunks, query):
+        """
+        Per-chunk cosine similarity to the query. A RetrievalResult already
+        carries the query embedding and the stored chunk vectors, so nothing
+        is embedded; plain texts are embedded in one batch. None when the
+        retrieval never embedded the query (lexical fast path).
+        """
+        if isinstance(chunks, RetrievalResult):
+            return chunks.similarities()
+        texts = [getattr(chunk, "page_content", chunk) for chunk in chunks]
+        return self.batch_cosine_similarity(
+            self.embedding_function.embed_query(query), self.embedding_function.embed_documents(texts)
+        )
+
+    def texts(self, chunks):
+        if isinstance(chunks, str):
+            return [chunks]
+        return [getattr(chunk, "page_content", chunk) for chunk in chunks]
+
+    def grade_input(self, texts, query):
+        numbered = "\n\n".join(f"[{i}] {text}" for i, text in enumerate(texts, start=1))
+        return {"query": query, "chunks": numbered, "count": len(texts)}
+
+    def ratings(self, response, count):
+        """Per chunk, its (relevance, completeness, faithfulness) on a 0-1 scale, or None if missing."""
+        entries = response.get("scores", []) if isinstance(response, dict) else response
+        ratings = [None] * count
+        for position, entry in enumerate(entries if isinstance(entries, list) else []):
+            try:
+                index = int(entry.get("chunk", position + 1)) - 1
+                values = tuple(min(max(float(entry[key]), 1), 5) / 5 for key in RATINGS)
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+            if 0 <= index < count:
+                ratings[index] = values
+        return ratings
+
+    def composite(self, similarity, rating):
         """
         Composite Scoring:
         - alpha = 0.4 for embedding similarity
         - beta = 0.3 for relevance
         - gamma = 0.15 for completeness
         - delta = 0.15 for faithfulness
+        A missing signal drops out and the remaining weights are rescaled.
         """
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "Evaluate the following chunk for how well it answers the user query."),
-            ("human", '''
-        Return only one valid JSON object. Do not include any explanation, markdown, or formatting. Your entire response should be a single JSON object.
-
-        Query:
-        {query}
-
-        Chunk:
-        {chunk}
-
-        Rate each from 1 to 5:
-        - relevance
-        - completeness
-        - faithfulness
+        total = weight = 0.0
+        if similarity is not None and np.isfinite(similarity):
+            total += SIMILARITY_WEIGHT * float(similarity)
+            weight += SIMILARITY_WEIGHT
+        if rating is not None:
+            total += sum(w * r for w, r in zip(RATING_WEIGHTS, rating))
+            weight += sum(RATING_WEIGHTS)
+        return float(round(total / weight, 3)) if weight else 0.0
 
-       Respond with a JSON object **in this exact format**:
+    def scores(self, texts, similarities, response):
+        """Composite scores of `texts` from one judge response."""
+        scores = [None] * len(texts)
+        self.merge(scores, list(range(len(texts))), texts, similarities, response)
+        return scores
 
-        {{
-          "relevance": 5,
-          "completeness": 4,
-          "faithfulness": 5
-        }}
-        ''')
-        ])
-
-        base_chain = prompt | self.llm | JsonOutputParser()
-        final_composite_score = 0
-
-        if isinstance(chunks, str):
-            chunks = [chunks]
+    def triage(self, scores, rows, texts, similarities, query, tiered=GRADER_TIERED):
+        """
+        First tier of the cascade over the ungraded `rows`: a chunk the cheap
+        score decides gets the composite of its similarity and the rating the
+        decision stands for. Returns (judged, accepted): the ambiguous rows
+        that need the LLM judge, and the rows accepted without it.
+        """
+        if not tiered:
+            return list(rows), []
+        terms = set(tokenize(query))
+        judged, accepted = [], []
+        for i in rows:
+            similarity = None if similarities is None else similarities[i]
+            score = cheap_score(similarity, terms, texts[i])
+            if score is not None and score >= GRADER_ACCEPT_SCORE:
+                scores[i] = self.composite(similarity, ACCEPT_RATING)
+                accepted.append(i)
+            elif score is not None and score <= GRADER_REJECT_SCORE:
+                scores[i] = self.composite(similarity, REJECT_RATING)
+            else:
+                judged.append(i)
+        return judged, accepted
 
-        scores = []
+    def record(self, scores, pending, judged, accepted=()):
+        with self.stats_lock:
+            self.queries += 1
+            if judged:
+                self.llm_calls += 1
+            self.tiers["cached"] += len(scores) - len(pending)
+            self.tiers["judged"] += len(judged)
+            self.tiers["accepted"] += len(accepted)
+            self.tiers["rejected"] += len(pending) - len(judged) - len(accepted)
 
-        for chunk in chunks:
-            response = base_chain.invoke({
-                "query": query,
-                "chunk": chunk,
-            })
+    def merge(self, scores, rows, texts, similarities, response):
+        """Composite scores for the judged `rows`; returns the rows the model actually rated."""
+        ratings = self.ratings(response, len(rows))
+        missing = sum(rating is None for rating in ratings)
+        if missing:
+            print(f"⚠️ Grader returned no rating for {missing}/{len(rows)} chunk(s)")
+        for i, rating in zip(rows, ratings):
+            scores[i] = self.composite(None if similarities is None else similarities[i], rating)
+        return [i for i, rating in zip(rows, ratings) if rating is not None]
 
-            similarity_score = self.SimilarityScore([chunk], query)
+    def plan(self, chunks, query):
+        """(texts, scores, pending): cached grades filled in, `pending` rows still to grade."""
+        texts = self.texts(chunks)
+        scores = grade_cache.get(query, texts, GRADER_VERSION)
+        return texts, scores, [i for i, score in enumerate(scores) if score is None]
 
-            # Normalize LLM ratings to 0–1 scale
-            rel = response["relevance"] / 5
-            comp = response["completeness"] / 5
-            faith = response["faithfulness"] / 5
+    def remember(self, chunks, query, texts, scores, graded):
+        """Cache the grades worth reusing; a chunk the judge failed to rate is graded again next time."""
+        chunks = [chunks] if isinstance(chunks, str) else chunks
+        domains = [getattr(chunk, "metadata", {}).get("domain") for chunk in chunks]
+        grade_cache.put(
+            query, [texts[i] for i in graded], [scores[i] for i in graded], [domains[i] for i in graded],
+            GRADER_VERSION,
+        )
 
-            # Weighted average
-            alpha = 0.4
-            beta = 0.3
-            gamma = 0.15
-            delta = 0.15
+    def grade(self, chunks, query):
+        """
+        Per-chunk composite scores, in chunk order. Cached grades are reused;
+        chunks the cheap tier cannot decide are rated together in one
+        structured LLM call, and when it decides them all, no call is made.
+        `chunks` is a RetrievalResult (no embedding calls), Documents or texts.
+        """
+        texts, scores, pending = self.plan(chunks, query)
+        if not pending:
+            self.record(scores, pending, [])
+            return scores
+        similarities = self.similarities(chunks, query)
+        judged, accepted = self.triage(scores, pending, texts, similarities, query)
+        self.record(scores, pending, judged, accepted)
+        rated = []
+        if judged:
+            grade_input = self.grade_input([texts[i] for i in judged], query)
+            try:
+                response = governor.run(self.llm, "generate", lambda: self.chain.invoke(grade_input))
+            except OutputParserException as e:
+                print(f"⚠️ Could not parse the grader response: {e}")
+                response = {}
+            rated = self.merge(scores, judged, texts, similarities, response)
+        decided = [i for i in pending if i not in judged]
+        self.remember(chunks, query, texts, scores, decided + rated)
+        return scores
 
-            composite_score = (
-                    alpha * similarity_score +
-                    beta * rel +
-                    gamma * comp +
-                    delta * faith
-            )
+    async def agrade(self, chunks, query):
+        """Async `grade`: the LLM call is awaited, local similarity and cache work runs in a thread."""
+        texts, scores, pending = await asyncio.to_thread(self.plan, chunks, query)
+        if not pending:
+            self.record(scores, pending, [])
+            return scores
+        similarities = await asyncio.to_thread(self.similarities, chunks, query)
+        judged, accepted = self.triage(scores, pending, texts, similarities, query)
+        self.record(scores, pending, judged, accepted)
+        rated = []
+        if judged:
+            grade_input = self.grade_input([texts[i] for i in judged], query)
+            try:
+                response = await governor.arun(self.llm, "generate", lambda: self.chain.ainvoke(grade_input))
+            except OutputParserException as e:
+                print(f"⚠️ Could not parse the grader response: {e}")
+                response = {}
+            rated = self.merge(scores, judged, texts, similarities, response)
+        decided = [i for i in pending if i not in judged]
+        await asyncio.to_thread(self.remember, chunks, query, texts, scores, decided + rated)
+        return scores
 
-            final_composite_score = float(round(composite_score, 3))
+    def rank(self, chunks, scores, min_score=GRADER_MIN_SCORE, reorder=GRADER_REORDER):
+        """Drop chunks scoring below `min_score` and optionally order the rest best first."""
+        rows = [i for i, score in enumerate(scores) if score >= min_score]
+        if reorder:
+            rows.sort(key=lambda i: scores[i], reverse=True)
+        if isinstance(chunks, RetrievalResult):
+            return chunks.select(rows)
+        return [chunks[i] for i in rows]
 
+    def stats(self):
+        with self.stats_lock:
+            chunks = sum(self.tiers.values())
+            return {
+                "tiered": GRADER_TIERED,
+                "accept_score": GRADER_ACCEPT_SCORE,
+                "reject_score": GRADER_REJECT_SCORE,
+                "queries": self.queries,
+                "llm_calls": self.llm_calls,
+                "llm_skip_rate": round(1 - self.llm_calls / self.queries, 3) if self.queries else 0.0,
+                "chunks": dict(self.tiers),
+                "decided_rate": {
+                    tier: round(count / chunks, 3) if chunks else 0.0 for tier, count in self.tiers.items()
+                },
+            }
 
-        return final_composite_score
+    def CompositeGrader(self, chunks, query):
+        """Mean composite score of the chunks; `grade` gives the per-chunk scores."""
+        scores = self.grade(chunks, query)
+        return float(round(np.mean(scores), 3)) if scores else 0
 
 
 grader = Grader()
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import httpx
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+def build_client():
+    return httpx.AsyncClient(
+        http2=True,
+        follow_redirects=True,
+        timeout=HTTP_TIMEOUT_SECONDS,
+        headers=DEFAULT_HEADERS,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        ),
+    )
+
+
+class SharedHttpClient:
+    """
+    One connection-pooled, HTTP/2-capable httpx client for the whole process.
+
+    Started and closed from the FastAPI lifespan. `async with http_client.session() as client:`
+    hands out the shared client on the app loop and a short-lived one anywhere else,
+    since httpx connections cannot cross event loops.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._loop = None
+
+    @property
+    def started(self):
+        return self._client is not None
+
+    async def start(self):
+        if self.started:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._client = build_client()
+        print("🌐 Shared HTTP client started")
+
+    async def close(self):
+        if not self.started:
+            return
+        await self._client.aclose()
+        self._client = None
+        self._loop = None
+        print("🌐 Shared HTTP client closed")
+
+    @asynccontextmanager
+    async def session(self):
+        if self.started and asyncio.get_running_loop() is self._loop:
+            yield self._client
+            return
+
+        async with build_client() as client:
+            yield client
+
+
+http_client = SharedHttpClient()
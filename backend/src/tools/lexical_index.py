@@ -0,0 +1,201 @@
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from backend.src.utils.storage import SQLiteStore
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Standard reciprocal rank fusion constant
+RRF_K = 60
+
+# The lexical fast path answers without a query embedding when a short,
+# keyword-shaped query has all its terms in the best chunk and k chunks match
+LEXICAL_FAST_PATH = os.getenv("LEXICAL_FAST_PATH", "true").lower() == "true"
+LEXICAL_FAST_PATH_MAX_TERMS = int(os.getenv("LEXICAL_FAST_PATH_MAX_TERMS", "3"))
+LEXICAL_FAST_PATH_MIN_SCORE = float(os.getenv("LEXICAL_FAST_PATH_MIN_SCORE", "2.0"))
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about all also an and any are as at be been but by can could did do does for from had has have how i if in
+into is it its may me might my no not of on or our out shall should so such than that the their them then there
+these they this those to under us was we were what when where which while who why will with would you your
+policy policies company
+""".split())
+
+
+def stem(token: str) -> str:
+    """Tiny suffix stripper so "cookies"/"cookie" and "renewals"/"renewal" meet."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str):
+    """Lowercased, stemmed terms without stopwords; "auto-renewal" gives auto, renewal."""
+    return [stem(t) for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked lists of keys; returns keys by descending sum of 1 / (k + rank)."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class LexicalIndex(SQLiteStore):
+    """
+    BM25 inverted index over the stored chunks, built at ingest next to the
+    vectors and scoped like them: statistics are per collection partition,
+    and each chunk carries its domain for filtering the shared collection.
+
+    A `base` index (the one bundled with a vector snapshot) answers for
+    partitions this index has no chunks for yet.
+    """
+
+    def __init__(self, path=None):
+        self.base = None
+        self.stats_lock = threading.Lock()
+        self.searches = 0
+        self.fast_path = 0
+        self.fused = 0
+        super().__init__("lexical.sqlite", path)
+
+    def setup(self, conn):
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS chunks (
+                partition TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                domain TEXT,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (partition, chunk_id)
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS postings (
+                partition TEXT NOT NULL,
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (partition, term, chunk_id)
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS postings_chunk ON postings (partition, chunk_id)")
+
+    def add(self, partition, ids, documents, metadatas):
+        """Index (or re-index) chunks of `partition`."""
+        with self.lock, self.conn:
+            self._delete(partition, ids)
+            for chunk_id, document, metadata in zip(ids, documents, metadatas):
+                terms = Counter(tokenize(document))
+                self.conn.execute(
+                    "INSERT INTO chunks (partition, chunk_id, domain, length) VALUES (?, ?, ?, ?)",
+                    (partition, chunk_id, (metadata or {}).get("domain"), sum(terms.values())),
+                )
+                self.conn.executemany(
+                    "INSERT INTO postings (partition, term, chunk_id, tf) VALUES (?, ?, ?, ?)",
+                    [(partition, term, chunk_id, tf) for term, tf in terms.items()],
+                )
+
+    def delete(self, partition, ids):
+        with self.lock, self.conn:
+            self._delete(partition, ids)
+
+    def _delete(self, partition, ids):
+        rows = [(partition, chunk_id) for chunk_id in ids]
+        self.conn.executemany("DELETE FROM postings WHERE partition = ? AND chunk_id = ?", rows)
+        self.conn.executemany("DELETE FROM chunks WHERE partition = ? AND chunk_id = ?", rows)
+
+    def drop(self, partition):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM postings WHERE partition = ?", (partition,))
+            self.conn.execute("DELETE FROM chunks WHERE partition = ?", (partition,))
+
+    def search(self, partition, query, k=3, domain=None):
+        """
+        Returns (hits, coverage): up to k (chunk_id, bm25 score) pairs and the
+        share of the query's terms found in the best hit.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], 0.0
+
+        domain_sql = " AND c.domain = ?" if domain else ""
+        domain_args = (domain,) if domain else ()
+        placeholders = ",".join("?" * len(terms))
+        with self.lock:
+            n, total_length = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks c WHERE c.partition = ?{domain_sql}",
+                (partition, *domain_args),
+            ).fetchone()
+            if n:
+                rows = self.conn.execute(
+                    f"""SELECT p.term, p.chunk_id, p.tf, c.length FROM postings p
+                        JOIN chunks c ON c.partition = p.partition AND c.chunk_id = p.chunk_id
+                        WHERE p.partition = ? AND p.term IN ({placeholders}){domain_sql}""",
+                    (partition, *terms, *domain_args),
+                ).fetchall()
+        if not n:
+            if self.base is not None and not self.has(partition):
+                return self.base.search(partition, query, k, domain)
+            return [], 0.0
+
+        df = Counter(term for term, _, _, _ in rows)
+        avgdl = total_length / n or 1
+        scores, matched = {}, {}
+        for term, chunk_id, tf, length in rows:
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avgdl))
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * norm
+            matched.setdefault(chunk_id, set()).add(term)
+
+        hits = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        coverage = len(matched[hits[0][0]]) / len(terms) if hits else 0.0
+        return hits, coverage
+
+    def has(self, partition):
+        with self.lock:
+            row = self.conn.execute("SELECT 1 FROM chunks WHERE partition = ? LIMIT 1", (partition,)).fetchone()
+        return row is not None
+
+    def attach(self, base):
+        self.base = base
+
+    def strong_match(self, query, hits, coverage, k):
+        """Whether the lexical hits are good enough to skip the query embedding."""
+        return (
+            LEXICAL_FAST_PATH
+            and len(tokenize(query)) <= LEXICAL_FAST_PATH_MAX_TERMS
+            and coverage == 1.0
+            and len(hits) >= k
+            and hits[0][1] >= LEXICAL_FAST_PATH_MIN_SCORE
+        )
+
+    def record(self, fast_path):
+        with self.stats_lock:
+            self.searches += 1
+            if fast_path:
+                self.fast_path += 1
+            else:
+                self.fused += 1
+
+    def stats(self):
+        with self.lock:
+            chunks = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        with self.stats_lock:
+            return {
+                "chunks": chunks,
+                "searches": self.searches,
+                "fast_path": self.fast_path,
+                "fused": self.fused,
+                "fast_path_rate": round(self.fast_path / self.searches, 3) if self.searches else 0.0,
+            }
+
+
+lexical_index = LexicalIndex()
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import re
+import time
+
+from backend.src.utils.storage import SQLiteStore
+
+TIER_STATIC = "static"
+TIER_RENDERED = "rendered"
+
+# Content-sufficiency thresholds for the static tier
+STATIC_MIN_TEXT_CHARS = int(os.getenv("STATIC_MIN_TEXT_CHARS", "1000"))
+STATIC_MAX_BOILERPLATE_RATIO = float(os.getenv("STATIC_MAX_BOILERPLATE_RATIO", "0.7"))
+BOILERPLATE_LINE_CHARS = 40
+
+# How long a remembered "needs rendering" verdict is trusted
+TIER_MEMORY_TTL_SECONDS = int(os.getenv("TIER_MEMORY_TTL_SECONDS", str(7 * 24 * 3600)))
+
+APP_SHELL_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in [
+        r'<div[^>]+id=["\'](root|app|__next|__nuxt|svelte)["\'][^>]*>\s*</div>',
+        r"<app-root[^>]*>\s*</app-root>",
+        r"(enable|turn on) javascript",
+        r"requires javascript",
+    ]
+]
+
+
+def normalized_text_hash(text: str) -> str:
+    """Hash of the text with whitespace collapsed, so layout-only changes don't count."""
+    normalized = " ".join(text.split()).lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def boilerplate_ratio(text: str) -> float:
+    """Share of lines that look like menu items, buttons or toggles rather than prose."""
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        return 1.0
+    short = sum(1 for line in lines if len(line) < BOILERPLATE_LINE_CHARS)
+    return short / len(lines)
+
+
+def looks_like_app_shell(html: str) -> bool:
+    return any(pattern.search(html) for pattern in APP_SHELL_PATTERNS)
+
+
+def content_sufficient(html: str, text: str):
+    """
+    Decide whether a static fetch already holds the policy text.
+    Returns (sufficient, reason) so the escalation can be logged.
+    """
+    if len(text) < STATIC_MIN_TEXT_CHARS:
+        if looks_like_app_shell(html):
+            return False, "javascript app shell"
+        return False, f"only {len(text)} chars of text"
+
+    ratio = boilerplate_ratio(text)
+    if ratio > STATIC_MAX_BOILERPLATE_RATIO:
+        return False, f"boilerplate ratio {ratio:.2f}"
+
+    return True, "ok"
+
+
+class DomainTierMemory(SQLiteStore):
+    """Remembers per domain which fetch tier produced usable text last time."""
+
+    def __init__(self, path=None):
+        super().__init__("scraper.sqlite", path)
+
+    def setup(self, conn):
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS domain_tiers (
+                host TEXT PRIMARY KEY,
+                tier TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+
+    def get(self, host: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT tier, updated_at FROM domain_tiers WHERE host = ?", (host,)
+            ).fetchone()
+        if not row:
+            return None
+        tier, updated_at = row
+        if tier == TIER_RENDERED and time.time() - updated_at > TIER_MEMORY_TTL_SECONDS:
+            # Give the cheap tier another chance now and then
+            return None
+        return tier
+
+    def record(self, host: str, tier: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO domain_tiers (host, tier, updated_at) VALUES (?, ?, ?)",
+                (host, tier, time.time()),
+            )
+
+
+tier_memory = DomainTierMemory()
+
+
+class FetchRecordStore(SQLiteStore):
+    """
+    Last successfully ingested version of each policy URL per company: HTTP
+    validators (ETag / Last-Modified) for conditional GETs and the normalized
+    text hash. Companies often link the same policy URL, and each one keeps
+    its own chunks of it, so records are keyed by (company, url).
+    """
+
+    def __init__(self, path=None):
+        super().__init__("scraper.sqlite", path)
+
+    def setup(self, conn):
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(fetch_records)")]
+        if columns and "company" not in columns:
+            # Records keyed by URL alone can't be attributed to a company; the
+            # next scrape fetches in full and stable chunk IDs skip re-embedding
+            conn.execute("DROP TABLE fetch_records")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS fetch_records (
+                company TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (company, url)
+            )"""
+        )
+
+    def get(self, company: str, url: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash FROM fetch_records WHERE company = ? AND url = ?",
+                (company, url),
+            ).fetchone()
+        if not row:
+            return None
+        return {"company": company, "url": url, "etag": row[0], "last_modified": row[1], "content_hash": row[2]}
+
+    def save(self, record: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO fetch_records
+                   (company, url, etag, last_modified, content_hash, fetched_at) VALUES (?, ?, ?, ?, ?, ?)""",
+                (record["company"], record["url"], record.get("etag"), record.get("last_modified"),
+                 record["content_hash"], time.time()),
+            )
+
+
+fetch_records = FetchRecordStore()
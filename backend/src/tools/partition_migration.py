@@ -0,0 +1,149 @@
+"""
+Split the shared `vectorDB` collection into per-domain partitions.
+
+Copies every chunk (ids, documents, metadata and stored embeddings, so no
+re-embedding) into the collection `partition_name(domain)` picks for the
+configured VECTOR_PARTITION_MODE. Safe to re-run: chunks are upserted under
+their existing IDs. The shared collection is only emptied with --drop-source.
+
+With --backend exact, every Chroma collection (shared and partitions) is
+copied into the memory-mapped ExactStore instead. Copied chunks are also
+added to the BM25 lexical index; --reindex-lexical rebuilds that index alone.
+
+Run from the repository root:
+    python -m backend.src.tools.partition_migration [--mode domain|bucket] [--backend chroma|exact] [--drop-source]
+"""
+import argparse
+import time
+
+from backend.src.tools.exact_store import exact_store
+from backend.src.tools.lexical_index import lexical_index
+from backend.src.tools.partitions import PARTITION_MODES, VECTOR_PARTITION_MODE, is_partition, partition_name
+from backend.src.tools.store_registry import store_registry
+
+MIGRATION_PAGE_SIZE = 500
+
+
+def copy_chunks(source, target, vectordb_name, mode, page_size=MIGRATION_PAGE_SIZE):
+    """Upsert every chunk of `source` into its partition in `target`; returns (moved, unrouted)."""
+    total = source.count()
+    moved = {}
+    unrouted = 0
+    offset = 0
+    while offset < total:
+        page = source.get(
+            limit=page_size, offset=offset, include=["documents", "metadatas", "embeddings"]
+        )
+        if not len(page["ids"]):
+            break
+        offset += len(page["ids"])
+
+        groups = {}
+        for chunk_id, document, metadata, embedding in zip(
+            page["ids"], page["documents"], page["metadatas"], page["embeddings"]
+        ):
+            domain = (metadata or {}).get("domain")
+            if not domain and mode != "single":
+                unrouted += 1
+                continue
+            name = partition_name(domain, base=vectordb_name, mode=mode)
+            groups.setdefault(name, []).append((chunk_id, document, metadata, embedding))
+
+        for name, rows in groups.items():
+            target.collection(name, vectordb_name).upsert(
+                ids=[row[0] for row in rows],
+                documents=[row[1] for row in rows],
+                metadatas=[row[2] for row in rows],
+                embeddings=[row[3] for row in rows],
+            )
+            lexical_index.add(name, [row[0] for row in rows], [row[1] for row in rows], [row[2] for row in rows])
+            moved[name] = moved.get(name, 0) + len(rows)
+        print(f"   {offset}/{total}")
+    return moved, unrouted
+
+
+def migrate(vectordb_name="vectorDB", mode=VECTOR_PARTITION_MODE, drop_source=False, page_size=MIGRATION_PAGE_SIZE):
+    if mode == "single":
+        print("ℹ️ Partition mode is 'single', nothing to migrate")
+        return {}
+
+    source = store_registry.collection(vectordb_name, create=False)
+    if source is None:
+        print(f"❌ Collection {vectordb_name} not found")
+        return {}
+
+    print(f"🚚 Migrating {source.count()} chunk(s) from {vectordb_name} ({mode} partitions)")
+    started = time.perf_counter()
+    moved, unrouted = copy_chunks(source, store_registry, vectordb_name, mode, page_size)
+
+    print(f"✅ Copied {sum(moved.values())} chunk(s) into {len(moved)} partition(s) "
+          f"in {time.perf_counter() - started:.1f}s")
+    if unrouted:
+        print(f"⚠️ {unrouted} chunk(s) without a domain stay in {vectordb_name}")
+
+    if drop_source and not unrouted:
+        # Chunks were copied under the same IDs, so removing them is lossless
+        copied = source.get(include=[])["ids"]
+        for start in range(0, len(copied), page_size):
+            source.delete(ids=copied[start:start + page_size])
+        lexical_index.drop(vectordb_name)
+        print(f"🗑️ Emptied {vectordb_name}")
+    elif drop_source:
+        print(f"⚠️ Kept {vectordb_name} because some chunks could not be routed")
+
+    return moved
+
+
+def export_exact(vectordb_name="vectorDB", mode=VECTOR_PARTITION_MODE, page_size=MIGRATION_PAGE_SIZE):
+    """Copy the Chroma store (shared collection and partitions) into the ExactStore."""
+    names = [name for name in store_registry.collection_names(vectordb_name)
+             if name == vectordb_name or is_partition(name)]
+    started = time.perf_counter()
+    moved = {}
+    for name in names:
+        source = store_registry.collection(name, vectordb_name)
+        print(f"🚚 Exporting {source.count()} chunk(s) from {name} to the exact store")
+        copied, unrouted = copy_chunks(source, exact_store, vectordb_name, mode, page_size)
+        for partition, count in copied.items():
+            moved[partition] = moved.get(partition, 0) + count
+        if unrouted:
+            print(f"⚠️ {unrouted} chunk(s) without a domain in {name} were not exported")
+
+    print(f"✅ Exported {sum(moved.values())} chunk(s) into {len(moved)} exact partition(s) "
+          f"in {time.perf_counter() - started:.1f}s")
+    return moved
+
+
+def reindex_lexical(vectordb_name="vectorDB", store=store_registry, page_size=MIGRATION_PAGE_SIZE):
+    """Rebuild the BM25 index from the chunks already in the vector store."""
+    names = [name for name in store.collection_names(vectordb_name) if name == vectordb_name or is_partition(name)]
+    indexed = 0
+    for name in names:
+        collection = store.collection(name, vectordb_name)
+        lexical_index.drop(name)
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas"])
+            lexical_index.add(name, page["ids"], page["documents"], page["metadatas"])
+            indexed += len(page["ids"])
+    print(f"🔤 Indexed {indexed} chunk(s) from {len(names)} collection(s) for lexical search")
+    return indexed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectordb", default="vectorDB")
+    parser.add_argument("--mode", choices=PARTITION_MODES, default=VECTOR_PARTITION_MODE)
+    parser.add_argument("--backend", choices=("chroma", "exact"), default="chroma")
+    parser.add_argument("--drop-source", action="store_true")
+    parser.add_argument("--reindex-lexical", action="store_true",
+                        help="only rebuild the BM25 index of the --backend store")
+    args = parser.parse_args()
+
+    if args.reindex_lexical:
+        reindex_lexical(args.vectordb, exact_store if args.backend == "exact" else store_registry)
+    elif args.backend == "exact":
+        export_exact(args.vectordb, args.mode)
+    else:
+        migrate(args.vectordb, args.mode, args.drop_source)
+    store_registry.close()
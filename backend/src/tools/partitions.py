@@ -0,0 +1,32 @@
+import hashlib
+import os
+
+# "single" keeps every domain in one collection, "domain" gives each domain its
+# own collection, "bucket" hashes domains into VECTOR_PARTITION_BUCKETS collections
+VECTOR_PARTITION_MODE = os.getenv("VECTOR_PARTITION_MODE", "domain")
+VECTOR_PARTITION_BUCKETS = int(os.getenv("VECTOR_PARTITION_BUCKETS", "64"))
+
+PARTITION_MODES = ("single", "domain", "bucket")
+PARTITION_PREFIXES = ("domain_", "bucket_")
+
+
+def normalize_domain(domain: str) -> str:
+    """Routing key for a company URL: case and trailing slashes don't matter."""
+    return (domain or "").strip().lower().rstrip("/")
+
+
+def partition_name(domain, base="vectorDB", mode=VECTOR_PARTITION_MODE, buckets=VECTOR_PARTITION_BUCKETS):
+    """
+    Collection that holds `domain`'s chunks. Names are hashes so they always
+    satisfy Chroma's collection-name rules.
+    """
+    if mode == "single" or not domain:
+        return base
+    digest = hashlib.sha256(normalize_domain(domain).encode("utf-8")).hexdigest()
+    if mode == "bucket":
+        return f"bucket_{int(digest[:8], 16) % buckets:04d}"
+    return f"domain_{digest[:32]}"
+
+
+def is_partition(name: str) -> bool:
+    return name.startswith(PARTITION_PREFIXES)
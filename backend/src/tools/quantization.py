@@ -0,0 +1,51 @@
+import numpy as np
+
+SCAN_DTYPES = ("float32", "float16", "int8")
+INT8_MAX = 127
+
+
+def normalize_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def truncate_dimensions(matrix, dims):
+    """
+    Keep the leading `dims` components and renormalize. text-embedding-005 is
+    trained so that prefixes remain usable embeddings (Vertex's own
+    output_dimensionality does the same). dims=0 keeps every component.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if not dims or dims >= matrix.shape[-1]:
+        return matrix
+    return normalize_rows(matrix[..., :dims])
+
+
+def quantize(matrix, dtype):
+    """
+    Returns (codes, scales). int8 uses symmetric per-row scaling, so each row
+    keeps its own range; float dtypes need no scales.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype != "int8":
+        return matrix.astype(dtype), None
+    scales = np.abs(matrix).max(axis=-1) / INT8_MAX
+    scales = np.where(scales == 0, 1, scales).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -INT8_MAX, INT8_MAX).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes, scales=None):
+    values = np.asarray(codes, dtype=np.float32)
+    if scales is None:
+        return values
+    return values * np.asarray(scales, dtype=np.float32)[..., None]
+
+
+def scan_scores(codes, scales, query):
+    """Approximate dot products of every stored row with `query` (float32)."""
+    scores = np.asarray(codes).astype(np.float32, copy=False) @ query
+    if scales is not None:
+        scores *= scales
+    return scores
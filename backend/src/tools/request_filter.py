@@ -0,0 +1,133 @@
+import os
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return [item.strip().lower() for item in value.split(",") if item.strip()]
+
+
+# Resource types that never contribute policy text
+BLOCKED_RESOURCE_TYPES = _env_list("SCRAPE_BLOCK_RESOURCE_TYPES", ["image", "media", "font"])
+
+# Trackers and ad networks (matched on the host and its subdomains)
+BLOCKED_DOMAINS = _env_list("SCRAPE_BLOCK_DOMAINS", [
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com",
+    "googleadservices.com", "doubleclick.net", "adservice.google.com",
+    "facebook.net", "connect.facebook.net", "analytics.tiktok.com",
+    "bat.bing.com", "clarity.ms", "hotjar.com", "segment.com", "segment.io",
+    "mixpanel.com", "amplitude.com", "fullstory.com", "scorecardresearch.com",
+    "quantserve.com", "adnxs.com", "criteo.com", "criteo.net", "taboola.com",
+    "outbrain.com", "amazon-adsystem.com", "nr-data.net", "newrelic.com",
+])
+
+# Rough transfer sizes used to estimate bytes saved by aborted requests
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 60_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+
+class InterceptionPolicy:
+    """Decides which requests a policy-rendering page may skip."""
+
+    def __init__(self, resource_types=None, domains=None):
+        self.resource_types = set(BLOCKED_RESOURCE_TYPES if resource_types is None else resource_types)
+        self.domains = set(BLOCKED_DOMAINS if domains is None else domains)
+
+    def blocked_domain(self, url):
+        host = urlparse(url).hostname or ""
+        return any(host == domain or host.endswith("." + domain) for domain in self.domains)
+
+    def block_reason(self, resource_type, url):
+        if resource_type in self.resource_types:
+            return resource_type
+        if self.blocked_domain(url):
+            return "tracker"
+        return None
+
+
+class PageTraffic:
+    """Per-page request counts, loaded bytes and estimated bytes saved."""
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.allowed = 0
+        self.blocked = Counter()
+        self.bytes_loaded = 0
+        self.bytes_saved_estimate = 0
+
+    async def handle(self, route):
+        request = route.request
+        reason = self.policy.block_reason(request.resource_type, request.url)
+        if reason is None:
+            self.allowed += 1
+            await route.continue_()
+            return
+
+        self.blocked[reason] += 1
+        self.bytes_saved_estimate += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+        await route.abort()
+
+    def on_response(self, response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            self.bytes_loaded += int(length)
+
+    def summary(self):
+        return {
+            "requests_allowed": self.allowed,
+            "requests_blocked": sum(self.blocked.values()),
+            "blocked_by_reason": dict(self.blocked),
+            "bytes_loaded": self.bytes_loaded,
+            "bytes_saved_estimate": self.bytes_saved_estimate,
+        }
+
+
+default_policy = InterceptionPolicy()
+
+_lock = threading.Lock()
+_totals = Counter()
+
+
+def _add_totals(traffic):
+    with _lock:
+        _totals["pages"] += 1
+        _totals["requests_allowed"] += traffic.allowed
+        _totals["requests_blocked"] += sum(traffic.blocked.values())
+        _totals["bytes_loaded"] += traffic.bytes_loaded
+        _totals["bytes_saved_estimate"] += traffic.bytes_saved_estimate
+
+
+@asynccontextmanager
+async def intercept_requests(page, policy=None):
+    """
+    Abort heavy and tracking requests on `page` while the block runs.
+    Yields the PageTraffic so callers can report what was saved.
+    """
+    traffic = PageTraffic(policy or default_policy)
+    await page.route("**/*", traffic.handle)
+    page.on("response", traffic.on_response)
+    try:
+        yield traffic
+    finally:
+        page.remove_listener("response", traffic.on_response)
+        try:
+            await page.unroute("**/*", traffic.handle)
+        except Exception:
+            pass
+        _add_totals(traffic)
+
+
+def interception_stats():
+    with _lock:
+        return dict(_totals)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from backend.src.tools.quantization import normalize_rows, truncate_dimensions
+
+
+class RetrievalResult(list):
+    """
+    Retrieved Documents, best first, plus what the search already had: the
+    query embedding and each chunk's stored vector. Existing callers keep
+    treating it as a list of Documents; the grader reads similarities from it
+    instead of embedding the query and the chunks again.
+
+    `vectors` holds one float32 row per document, NaN where the store had no
+    vector. Both are None when the lexical fast path answered without
+    embedding the query.
+    """
+
+    def __init__(self, documents=(), query_vector=None, vectors=None):
+        super().__init__(documents)
+        self.query_vector = None if query_vector is None else np.asarray(query_vector, dtype=np.float32)
+        self.vectors = vectors
+
+    def similarities(self):
+        """Cosine similarity of each chunk to the query (NaN without a stored vector), or None."""
+        if self.query_vector is None or self.vectors is None or not len(self):
+            return None
+        vectors = normalize_rows(self.vectors)
+        # Stored vectors may be truncated prefixes; compare on their width
+        query = truncate_dimensions(normalize_rows(self.query_vector), vectors.shape[-1])
+        return vectors @ query
+
+    def select(self, rows):
+        """A RetrievalResult of the documents at `rows`, in that order, with their vectors."""
+        vectors = None if self.vectors is None else self.vectors[list(rows)]
+        return RetrievalResult([self[row] for row in rows], self.query_vector, vectors)
@@ -0,0 +1,109 @@
+import threading
+
+import chromadb
+from langchain_chroma import Chroma
+
+from backend.src.utils.storage import data_warehouse_path
+
+
+class StoreRegistry:
+    """
+    Process-wide Chroma handles: one PersistentClient per vector store
+    directory and one collection (and LangChain wrapper) per collection name.
+
+    Handles are created on first use and reused by every request, so a query
+    only pays for the search itself. Creation is guarded by a lock; the
+    handles themselves are safe for concurrent readers. Started and closed
+    from the FastAPI lifespan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._collections = {}
+        self._vectorstores = {}
+        self.opened = 0
+
+    def start(self, names=("vectorDB",)):
+        for name in names:
+            self.collection(name)
+        print(f"🗄️ Vector store registry ready: {len(self._collections)} collection(s)")
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._vectorstores.clear()
+            self._collections.clear()
+            self._clients.clear()
+        if clients:
+            # Stops Chroma's cached systems so SQLite files are released
+            clients[0].clear_system_cache()
+
+    def client(self, vectordb_name="vectorDB"):
+        path = data_warehouse_path(vectordb_name)
+        client = self._clients.get(path)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(path)
+                if client is None:
+                    client = chromadb.PersistentClient(path=path)
+                    self._clients[path] = client
+        return client
+
+    def collection(self, name="vectorDB", vectordb_name=None, create=True):
+        """
+        Raw chromadb collection `name`, stored under data_warehouse/`vectordb_name`.
+        With create=False a missing collection returns None and is not cached.
+        """
+        vectordb_name = vectordb_name or name
+        key = (vectordb_name, name)
+        collection = self._collections.get(key)
+        if collection is None:
+            client = self.client(vectordb_name)
+            with self._lock:
+                collection = self._collections.get(key)
+                if collection is None:
+                    if create:
+                        collection = client.get_or_create_collection(name=name)
+                    else:
+                        try:
+                            collection = client.get_collection(name=name)
+                        except Exception:
+                            return None
+                    self._collections[key] = collection
+                    self.opened += 1
+        return collection
+
+    def collection_names(self, vectordb_name="vectorDB"):
+        # Older chromadb releases return names, newer ones Collection objects
+        return [getattr(c, "name", c) for c in self.client(vectordb_name).list_collections()]
+
+    def vectorstore(self, embedding_function, name="vectorDB", vectordb_name=None):
+        """LangChain Chroma wrapper over the shared client for similarity search."""
+        vectordb_name = vectordb_name or name
+        key = (vectordb_name, name, id(embedding_function))
+        vectorstore = self._vectorstores.get(key)
+        if vectorstore is None:
+            client = self.client(vectordb_name)
+            with self._lock:
+                vectorstore = self._vectorstores.get(key)
+                if vectorstore is None:
+                    vectorstore = Chroma(
+                        client=client,
+                        collection_name=name,
+                        embedding_function=embedding_function,
+                    )
+                    self._vectorstores[key] = vectorstore
+        return vectorstore
+
+    def stats(self):
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "collections": len(self._collections),
+                "vectorstores": len(self._vectorstores),
+                "opened": self.opened,
+            }
+
+
+store_registry = StoreRegistry()
@@ -0,0 +1,133 @@
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import types
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+
+# Keep this module light: it is re-imported by every extraction worker process.
+
+# XHTML policy pages are parsed as HTML on purpose
+warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+
+STRIP_TAGS = ["script", "style", "noscript", "template", "header", "footer", "svg", "meta", "nav", "aside", "form"]
+MIN_LINE_CHARS = 5
+
+EXTRACTION_ENGINE = os.getenv("EXTRACTION_ENGINE", "lxml")
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", "2"))
+# Pages smaller than this are cheap enough to parse on the event loop
+EXTRACTION_INLINE_MAX_BYTES = int(os.getenv("EXTRACTION_INLINE_MAX_BYTES", "100000"))
+
+
+def _clean_lines(text: str) -> str:
+    lines = text.splitlines()
+    lines = [line.strip() for line in lines if len(line.strip()) > MIN_LINE_CHARS]
+    return "\n".join(lines)
+
+
+def extract_with_bs4(html: str, parser="html.parser") -> str:
+    """Reference engine: BeautifulSoup tree, decompose unwanted tags, get_text."""
+    soup = BeautifulSoup(html, parser)
+
+    for tag in soup(STRIP_TAGS):
+        tag.decompose()
+
+    container = soup.find("main") or soup.find("article") or soup.body
+    if not container:
+        return ""
+
+    return _clean_lines(container.get_text(separator="\n"))
+
+
+def extract_with_lxml(html: str) -> str:
+    """Fast engine: libxml2 parse and a single strip pass over the tree."""
+    from lxml import etree, html as lxml_html
+
+    if not html or not html.strip():
+        return ""
+
+    try:
+        # Bytes input: lxml rejects str pages that open with an XML encoding declaration (XHTML)
+        parser = lxml_html.HTMLParser(encoding="utf-8")
+        root = lxml_html.document_fromstring(html.encode("utf-8"), parser=parser)
+    except (etree.ParserError, ValueError):
+        return extract_with_bs4(html)
+
+    # One traversal removes every unwanted element (and comments) at once
+    etree.strip_elements(root, etree.Comment, *STRIP_TAGS, with_tail=False)
+
+    container = next(root.iter("main"), None)
+    if container is None:
+        container = next(root.iter("article"), None)
+    if container is None:
+        container = root.find("body")
+    if container is None:
+        return ""
+
+    return _clean_lines("\n".join(container.itertext()))
+
+
+ENGINES = {
+    "bs4": extract_with_bs4,
+    "bs4-lxml": lambda html: extract_with_bs4(html, parser="lxml"),
+    "lxml": extract_with_lxml,
+}
+
+
+def extract_main_text(html: str, engine: str = None) -> str:
+    engine = engine or EXTRACTION_ENGINE
+    try:
+        return ENGINES[engine](html)
+    except ImportError:
+        # lxml missing in this environment
+        return extract_with_bs4(html)
+
+
+_pool = None
+_submit_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def submit_to_pool(fn, *args):
+    """
+    Submit to the extraction pool without the entry script. A spawned worker
+    re-runs the parent's __main__ file before its first task (src/api.py in
+    the container, which builds the whole app), and the pool starts workers
+    on submit. With __main__ briefly replaced by an empty module, workers
+    import only this module.
+    """
+    with _submit_lock:
+        main = sys.modules["__main__"]
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            return get_extraction_pool().submit(fn, *args)
+        finally:
+            sys.modules["__main__"] = main
+
+
+async def extract_main_text_async(html: str, engine: str = None) -> str:
+    """Extract off the event loop; large pages go to the bounded process pool."""
+    if len(html) <= EXTRACTION_INLINE_MAX_BYTES:
+        return extract_main_text(html, engine)
+
+    return await asyncio.wrap_future(submit_to_pool(extract_main_text, html, engine))
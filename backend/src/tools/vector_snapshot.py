@@ -0,0 +1,389 @@
+"""
+Prebuilt, read-optimized vector store bundles for fast cold starts.
+
+`export` compacts every partition of a vector store (Chroma or ExactStore,
+including a snapshot already layered under it) into one bundle directory:
+
+    manifest.json   format, scan dtype and width, and the domain manifest:
+                    per partition its domains, row range and metadata offset
+    vectors.npy     every partition's scan rows, contiguous and grouped by partition
+    scales.npy      per-row int8 scales (int8 only)
+    full.npy        float32 originals for rescoring (lossy formats only)
+    chunks.jsonl    one line of ids, documents and metadata per partition
+    lexical.sqlite  the BM25 index for the same chunks
+
+At startup the server reads only the manifest and maps the matrices; a
+partition's rows and metadata are read on its first query. The bundle is
+attached as a read-only base layer under the ExactStore and the lexical
+index: freshly ingested chunks land in local partitions, which are seeded
+from the snapshot on their first write and then take precedence.
+
+Bundles live under VECTOR_SNAPSHOT_DIR/<vectordb_name>, which is inside the
+image by default so a deploy ships its own snapshot.
+
+Run from the repository root:
+    python -m backend.src.tools.vector_snapshot export [--backend chroma|exact] [--dtype int8] [--dims 256]
+    python -m backend.src.tools.vector_snapshot inspect
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from backend.src.tools.exact_store import (
+    EXACT_RESCORE, EXACT_RESCORE_OVERSAMPLE, EXACT_STORE_DIMENSIONS, EXACT_STORE_DTYPE, VECTOR_BACKEND,
+    PartitionReader, PartitionSnapshot, exact_store
+)
+from backend.src.tools.lexical_index import LexicalIndex, lexical_index
+from backend.src.tools.partitions import is_partition
+from backend.src.tools.quantization import SCAN_DTYPES, normalize_rows, quantize, truncate_dimensions
+from backend.src.utils.storage import data_warehouse_path
+
+VECTOR_SNAPSHOT_DIR = os.getenv("VECTOR_SNAPSHOT_DIR", data_warehouse_path("snapshot"))
+VECTOR_SNAPSHOT = os.getenv("VECTOR_SNAPSHOT", "true").lower() == "true"
+
+SNAPSHOT_FORMAT = 1
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.jsonl"
+EXPORT_PAGE_SIZE = 500
+
+
+class SnapshotPartition(PartitionReader):
+    """One partition of a bundle: row slices of the shared mapped matrices, metadata read on first use."""
+
+    def __init__(self, bundle, name, entry):
+        self.bundle = bundle
+        self.name = name
+        self.entry = entry
+        self.oversample = bundle.oversample
+        self.lock = threading.Lock()
+        self.snapshot = None
+
+    def exists(self):
+        return True
+
+    def load(self):
+        if self.snapshot is not None:
+            return self.snapshot
+        with self.lock:
+            if self.snapshot is None:
+                rows = self.bundle.read_chunks(self.entry)
+                start, stop = self.entry["start"], self.entry["start"] + self.entry["rows"]
+                self.bundle.prefetch(start, stop)
+                # Slices of a memmap are views: nothing is read until a search touches them
+                self.snapshot = PartitionSnapshot(
+                    *(None if a is None else a[start:stop] for a in self.bundle.arrays()),
+                    rows["ids"], rows["documents"], rows["metadatas"], self.bundle.manifest["generation"],
+                )
+        return self.snapshot
+
+
+class SnapshotBundle:
+    """An opened bundle directory; matrices are mapped on first partition access."""
+
+    def __init__(self, path, oversample=EXACT_RESCORE_OVERSAMPLE):
+        self.path = path
+        self.oversample = max(1, oversample)
+        with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format {self.manifest.get('format')!r} in {path}")
+        self.lock = threading.Lock()
+        self._arrays = None
+        self._partitions = {}
+        self._lexical = None
+
+    def arrays(self):
+        if self._arrays is None:
+            with self.lock:
+                if self._arrays is None:
+                    files = self.manifest["files"]
+                    self._arrays = tuple(
+                        np.load(os.path.join(self.path, files[kind]), mmap_mode="r") if files.get(kind) else None
+                        for kind in ("vectors", "scales", "full")
+                    )
+        return self._arrays
+
+    def prefetch(self, start, stop):
+        """
+        Ask the kernel to read a partition's scan rows in one go: on a cold
+        disk, faulting them in page by page from the middle of the shared
+        matrix costs more than the scan itself.
+        """
+        vectors, scales, _ = self.arrays()
+        if not hasattr(os, "posix_fadvise"):
+            return
+        for array in (vectors, scales):
+            if array is None:
+                continue
+            row_bytes = array.itemsize * (array.shape[1] if array.ndim > 1 else 1)
+            fd = os.open(array.filename, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, array.offset + start * row_bytes, (stop - start) * row_bytes,
+                                 os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+
+    def read_chunks(self, entry):
+        with open(os.path.join(self.path, CHUNKS_FILE), "rb") as f:
+            f.seek(entry["offset"])
+            return json.loads(f.read(entry["length"]))
+
+    def names(self):
+        return list(self.manifest["partitions"])
+
+    def partition(self, name):
+        partition = self._partitions.get(name)
+        if partition is None:
+            with self.lock:
+                partition = self._partitions.setdefault(
+                    name, SnapshotPartition(self, name, self.manifest["partitions"][name])
+                )
+        return partition
+
+    def lexical(self):
+        if self._lexical is None and os.path.exists(os.path.join(self.path, "lexical.sqlite")):
+            self._lexical = LexicalIndex(path=os.path.join(self.path, "lexical.sqlite"))
+        return self._lexical
+
+    def loaded(self):
+        return [p for p in self._partitions.values() if p.snapshot is not None]
+
+
+class VectorSnapshot:
+    """
+    Read-only base layer for the ExactStore, backed by one bundle per vector
+    store. Opened from the FastAPI lifespan; everything but the manifest is
+    loaded lazily.
+    """
+
+    def __init__(self, root=VECTOR_SNAPSHOT_DIR):
+        self.root = root
+        self.bundles = {}
+        self.opened_s = None
+        self.seeded = 0
+
+    def bundle_path(self, vectordb_name="vectorDB"):
+        return os.path.join(self.root, vectordb_name)
+
+    def open(self, names=("vectorDB",)):
+        """Attach the bundles that exist for `names`; returns whether any was attached."""
+        if not VECTOR_SNAPSHOT:
+            return False
+        started = time.perf_counter()
+        for vectordb_name in names:
+            if not os.path.exists(os.path.join(self.bundle_path(vectordb_name), MANIFEST_FILE)):
+                continue
+            if VECTOR_BACKEND != "exact":
+                print(f"ℹ️ Snapshot {vectordb_name} is only served with VECTOR_BACKEND=exact, ignoring it")
+                continue
+            self.attach(vectordb_name)
+        if not self.bundles:
+            return False
+        self.opened_s = time.perf_counter() - started
+        return True
+
+    def attach(self, vectordb_name="vectorDB"):
+        bundle = SnapshotBundle(self.bundle_path(vectordb_name))
+        self.bundles[vectordb_name] = bundle
+        exact_store.attach(self)
+        if bundle.lexical() is not None:
+            lexical_index.attach(bundle.lexical())
+        print(f"📦 Snapshot {vectordb_name}: {bundle.manifest['rows']} chunk(s) in "
+              f"{len(bundle.manifest['partitions'])} partition(s), built {bundle.manifest['created']}")
+        return bundle
+
+    # Base layer API used by ExactStore
+
+    def has(self, name, vectordb_name="vectorDB"):
+        bundle = self.bundles.get(vectordb_name)
+        return bundle is not None and name in bundle.manifest["partitions"]
+
+    def names(self, vectordb_name="vectorDB"):
+        bundle = self.bundles.get(vectordb_name)
+        return bundle.names() if bundle is not None else []
+
+    def partition(self, name, vectordb_name="vectorDB"):
+        return self.bundles[vectordb_name].partition(name)
+
+    def seed(self, name, vectordb_name, target):
+        """Copy a snapshot partition into the writable `target` before its first write."""
+        source = self.partition(name, vectordb_name).load()
+        if source.ids:
+            target.upsert(
+                ids=source.ids,
+                embeddings=source.original(np.arange(len(source.ids))),
+                documents=source.documents,
+                metadatas=source.metadatas,
+            )
+            lexical_index.add(name, source.ids, source.documents, source.metadatas)
+        self.seeded += 1
+        print(f"🌱 Seeded {name} with {len(source.ids)} chunk(s) from the snapshot")
+
+    def stats(self):
+        bundles = {}
+        for vectordb_name, bundle in self.bundles.items():
+            loaded = bundle.loaded()
+            bundles[vectordb_name] = {
+                "created": bundle.manifest["created"],
+                "dtype": bundle.manifest["dtype"],
+                "dimensions": bundle.manifest["dims"] or "full",
+                "partitions": len(bundle.manifest["partitions"]),
+                "rows": bundle.manifest["rows"],
+                "partitions_loaded": len(loaded),
+                "rows_loaded": sum(len(p.snapshot.ids) for p in loaded),
+            }
+        return {
+            "enabled": bool(self.bundles),
+            "open_ms": round(self.opened_s * 1000, 2) if self.opened_s is not None else None,
+            "seeded_partitions": self.seeded,
+            "bundles": bundles,
+        }
+
+
+def read_partition(collection, page_size=EXPORT_PAGE_SIZE):
+    """(ids, documents, metadatas, float32 vectors) of every chunk in a collection."""
+    ids, documents, metadatas, vectors = [], [], [], []
+    total = collection.count()
+    for offset in range(0, total, page_size):
+        page = collection.get(limit=page_size, offset=offset, include=["documents", "metadatas", "embeddings"])
+        if not len(page["ids"]):
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        vectors.extend(page["embeddings"])
+    return ids, documents, metadatas, np.asarray(vectors, dtype=np.float32)
+
+
+def export(store, output=None, vectordb_name="vectorDB", dtype=EXACT_STORE_DTYPE, dims=EXACT_STORE_DIMENSIONS,
+           rescore=EXACT_RESCORE):
+    """Write a bundle of every partition of `store`; the previous bundle is replaced once the new one is complete."""
+    if dtype not in SCAN_DTYPES:
+        raise ValueError(f"Unsupported snapshot dtype {dtype!r}, expected one of {SCAN_DTYPES}")
+    output = output or os.path.join(VECTOR_SNAPSHOT_DIR, vectordb_name)
+    names = sorted(
+        name for name in store.collection_names(vectordb_name) if name == vectordb_name or is_partition(name)
+    )
+    building = f"{output}.building-{uuid.uuid4().hex[:8]}"
+    os.makedirs(building)
+    started = time.perf_counter()
+
+    try:
+        lexical = LexicalIndex(path=os.path.join(building, "lexical.sqlite"))
+        partitions, domains, matrices = {}, {}, []
+        start = 0
+        with open(os.path.join(building, CHUNKS_FILE), "wb") as chunks:
+            for name in names:
+                collection = store.collection(name, vectordb_name, create=False)
+                if collection is None:
+                    continue
+                ids, documents, metadatas, vectors = read_partition(collection)
+                if not ids:
+                    continue
+                line = json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas}).encode("utf-8")
+                offset = chunks.tell()
+                chunks.write(line + b"\n")
+                partition_domains = sorted({m.get("domain") for m in metadatas if m and m.get("domain")})
+                partitions[name] = {
+                    "domains": partition_domains, "start": start, "rows": len(ids),
+                    "offset": offset, "length": len(line),
+                }
+                for domain in partition_domains:
+                    domains.setdefault(domain, name)
+                matrices.append(normalize_rows(vectors))
+                lexical.add(name, ids, documents, metadatas)
+                start += len(ids)
+        lexical.close()
+
+        files = {}
+        if matrices:
+            full = np.concatenate(matrices)
+            codes, scales = quantize(truncate_dimensions(full, dims), dtype)
+            arrays = {"vectors": codes, "scales": scales}
+            if rescore and (dtype != "float32" or bool(dims and dims < full.shape[-1])):
+                arrays["full"] = full
+            for kind, array in arrays.items():
+                if array is not None:
+                    files[kind] = f"{kind}.npy"
+                    np.save(os.path.join(building, files[kind]), array)
+
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "generation": uuid.uuid4().hex[:12],
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "vectordb": vectordb_name,
+            "dtype": dtype,
+            "dims": dims,
+            "rows": start,
+            "files": files,
+            "partitions": partitions,
+            "domains": domains,
+        }
+        with open(os.path.join(building, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=1)
+    except BaseException:
+        shutil.rmtree(building, ignore_errors=True)
+        raise
+
+    retired = None
+    if os.path.exists(output):
+        retired = f"{output}.retired-{uuid.uuid4().hex[:8]}"
+        os.replace(output, retired)
+    os.replace(building, output)
+    if retired:
+        shutil.rmtree(retired, ignore_errors=True)
+
+    print(f"📦 Exported {start} chunk(s) in {len(partitions)} partition(s) to {output} "
+          f"({directory_mb(output):.1f} MB, {time.perf_counter() - started:.1f}s)")
+    return manifest
+
+
+def directory_mb(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names
+    ) / 1024 / 1024
+
+
+def inspect(path):
+    bundle = SnapshotBundle(path)
+    manifest = bundle.manifest
+    print(f"📦 {path}: format {manifest['format']}, built {manifest['created']}")
+    print(f"   {manifest['rows']} chunk(s), {len(manifest['partitions'])} partition(s), "
+          f"{len(manifest['domains'])} domain(s), {manifest['dtype']} x {manifest['dims'] or 'full'}, "
+          f"{directory_mb(path):.1f} MB")
+    for name, entry in sorted(manifest["partitions"].items(), key=lambda item: -item[1]["rows"])[:10]:
+        print(f"   {entry['rows']:>6}  {name}  {', '.join(entry['domains'][:3])}")
+
+
+vector_snapshot = VectorSnapshot()
+
+
+if __name__ == "__main__":
+    from backend.src.tools.store_registry import store_registry
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=("export", "inspect"))
+    parser.add_argument("--vectordb", default="vectorDB")
+    parser.add_argument("--backend", choices=("chroma", "exact"), default=VECTOR_BACKEND)
+    parser.add_argument("--output")
+    parser.add_argument("--dtype", choices=SCAN_DTYPES, default=EXACT_STORE_DTYPE)
+    parser.add_argument("--dims", type=int, default=EXACT_STORE_DIMENSIONS)
+    parser.add_argument("--no-rescore", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "inspect":
+        inspect(args.output or vector_snapshot.bundle_path(args.vectordb))
+    else:
+        current = os.path.join(vector_snapshot.bundle_path(args.vectordb), MANIFEST_FILE)
+        if args.backend == "exact" and os.path.exists(current):
+            # Re-exporting compacts the current snapshot together with the local deltas
+            vector_snapshot.attach(args.vectordb)
+        export(exact_store if args.backend == "exact" else store_registry, args.output, args.vectordb,
+               args.dtype, args.dims, not args.no_rescore)
+        store_registry.close()
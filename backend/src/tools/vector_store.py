@@ -1,24 +1,39 @@
-import chromadb
 from backend.auth.init_vertex import init_vertex_ai
+import asyncio
+import hashlib
 import os
-from langchain_chroma import Chroma
-from langchain_google_vertexai import VertexAIEmbeddings
+import threading
+from collections import Counter
+import numpy as np
+from langchain_core.documents import Document
 from backend.src.tools.webscraper import ScraperManager
+from backend.src.tools.store_registry import store_registry
+from backend.src.tools.exact_store import VECTOR_BACKEND, exact_store, matches
+from backend.src.tools.lexical_index import lexical_index, reciprocal_rank_fusion
+from backend.src.tools.partitions import VECTOR_PARTITION_MODE, is_partition, partition_name
+from backend.src.tools.embeddings import EmbeddingPipeline, get_embedding_function
+from backend.src.tools.embedding_cache import text_key
+from backend.src.tools.grade_cache import grade_cache
+from backend.src.tools.quantization import truncate_dimensions
+from backend.src.tools.retrieval_result import RetrievalResult
+
+# "hybrid" fuses BM25 and vector rankings (with the lexical fast path), "vector" is embedding-only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")
+# Each ranking contributes k * HYBRID_CANDIDATES candidates to the fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "3"))
+
 
 class VectorStoreManager:
     def __init__(self):
         init_vertex_ai()
-        self.embedding_function = VertexAIEmbeddings(model_name="text-embedding-005")
+        self.embedding_function = get_embedding_function()
+        self.embedder = EmbeddingPipeline(self.embedding_function)
+        # Both expose collection(name, vectordb_name, create) and collection_names()
+        self.store = exact_store if VECTOR_BACKEND == "exact" else store_registry
 
     def vectordb_setup(self, vectordb_name="vectorDB"):
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data_warehouse", vectordb_name))
-
-
-        vector_store = Chroma(
-            collection_name=vectordb_name,
-            embedding_function=self.embedding_function,
-            persist_directory=base_dir
-        )
+        # Partitions are created on first write; this is the shared/legacy collection
+        self.store.collection(vectordb_name)
         return "created"
 
     def sanitize_metadata(self,metadata: dict) -> dict:
@@ -34,102 +49,395 @@ class VectorStoreManager:
                 clean[k] = str(v)  # Catch-all
         return clean
 
-    async def vectordb_add(self, docs, vectordb_name="vectorDB"):
-
-        base_dir = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "..", "data_warehouse", vectordb_name)
-        )
-        print("Embedding data to vector store:", base_dir)
+    def chunk_ids(self, docs):
+        """
+        Stable IDs from domain, source URL and chunk-content hash, so the same
+        chunk always maps to the same ID. Repeated identical chunks within one
+        source get an occurrence counter.
+        """
+        seen = Counter()
+        ids = []
+        for doc in docs:
+            domain = doc.metadata.get("domain", "")
+            source = doc.metadata.get("source", "")
+            key = (domain, source, text_key(doc.page_content))
+            occurrence = seen[key]
+            seen[key] += 1
+            digest = hashlib.sha256("|".join([*key, str(occurrence)]).encode("utf-8")).hexdigest()
+            ids.append(f"chunk_{digest[:32]}")
+        return ids
+
+    def delete_vanished_chunks(self, collection, docs, keep_ids, refreshed_sources):
+        """Drop stored chunks of re-scraped sources that the new scrape no longer produced."""
+        refreshed_sources = set(refreshed_sources)
+        vanished = []
+        for domain in {doc.metadata.get("domain") for doc in docs if doc.metadata.get("domain")}:
+            stored = collection.get(where={"domain": domain}, include=["metadatas"])
+            for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+                if chunk_id not in keep_ids and (metadata or {}).get("source") in refreshed_sources:
+                    vanished.append(chunk_id)
+
+        if vanished:
+            collection.delete(ids=vanished)
+            print(f"🗑️ Removed {len(vanished)} chunk(s) no longer present in re-scraped pages")
+        return vanished
+
+    def partition_for(self, domain, vectordb_name="vectorDB"):
+        return partition_name(domain, base=vectordb_name)
+
+    def seed_from_shared(self, names, vectordb_name="vectorDB"):
+        """
+        Move chunks that predate partitioning from the shared collection into
+        the partitions in `names`, which are about to be written for the first
+        time. Queries stop searching the shared collection for a domain once
+        its partition exists, so chunks of pages the fetch records skip would
+        otherwise be unreachable, and stale ones could never be deleted.
+        """
+        shared = self.store.collection(vectordb_name, vectordb_name, create=False)
+        if shared is None or not shared.count():
+            return 0
+
+        stored = shared.get(include=["metadatas"])
+        moves = {}
+        for chunk_id, metadata in zip(stored["ids"], stored["metadatas"]):
+            name = self.partition_for((metadata or {}).get("domain"), vectordb_name)
+            if name in names:
+                moves.setdefault(name, []).append(chunk_id)
+
+        moved = 0
+        for name, ids in moves.items():
+            rows = shared.get(ids=ids, include=["documents", "metadatas", "embeddings"])
+            self.store.collection(name, vectordb_name).upsert(
+                ids=rows["ids"],
+                embeddings=list(rows["embeddings"]),
+                documents=rows["documents"],
+                metadatas=rows["metadatas"],
+            )
+            lexical_index.add(name, rows["ids"], rows["documents"], rows["metadatas"])
+            # Writable handle: a snapshot-backed shared collection is copied locally first
+            self.store.collection(vectordb_name, vectordb_name).delete(ids=rows["ids"])
+            lexical_index.delete(vectordb_name, rows["ids"])
+            moved += len(rows["ids"])
+            print(f"🚚 Moved {len(rows['ids'])} chunk(s) from {vectordb_name} into {name}")
+        return moved
+
+    async def vectordb_add(self, docs, vectordb_name="vectorDB", refreshed_sources=None, failed_sources=None):
+        """
+        Incremental upsert: only chunks whose stable ID is not stored yet are
+        embedded and added, each into its domain's partition. Chunks of
+        `refreshed_sources` that vanished from the new scrape are deleted,
+        unless some of that source's new chunks failed to embed; those sources
+        are added to `failed_sources`.
+        """
+        print("Embedding data to vector store:", vectordb_name)
+        failed_sources = set() if failed_sources is None else failed_sources
 
         if not docs:
             print("❌ No documents to embed.")
             return False
 
-        embeddings = []
-        valid_docs = []
-
+        partitions = {}
         for i, doc in enumerate(docs):
-            content = doc.page_content.strip()
-            if not content:
+            if not doc.page_content.strip():
                 print(f"⚠️ Skipping empty content at index {i}")
                 continue
+            name = self.partition_for(doc.metadata.get("domain"), vectordb_name)
+            partitions.setdefault(name, []).append(doc)
 
-            try:
-                emb = await self.embedding_function.aembed_query(content)
-                if not emb or not isinstance(emb, list):
-                    print(f"❌ Invalid embedding at index {i}")
-                    continue
-
-                embeddings.append(emb)
-                valid_docs.append(doc)
-            except Exception as e:
-                print(f"❌ Embedding error at index {i}: {e}")
-                continue
-
-        if not embeddings:
-            print("❌ No valid embeddings were created.")
-            return False
-
-
-
-        print(f"✅ Created {len(embeddings)} embeddings. First vector size: {len(embeddings[0])}")
-
-
-        client = chromadb.PersistentClient(path=base_dir)
         try:
-            collection = client.get_collection(name=vectordb_name)
+            new_names = {
+                name for name in partitions
+                if name != vectordb_name and self.store.collection(name, vectordb_name, create=False) is None
+            }
+            if new_names:
+                self.seed_from_shared(new_names, vectordb_name)
+            collections = {name: self.store.collection(name, vectordb_name) for name in partitions}
         except Exception as e:
             print(f"❌ Failed to get collection: {e}")
             return False
 
+        candidate_ids = {}
+        new_docs, new_ids, new_partitions = [], [], []
+        for name, partition_docs in partitions.items():
+            ids = self.chunk_ids(partition_docs)
+            candidate_ids[name] = ids
+            existing_ids = set(collections[name].get(ids=ids, include=[])["ids"])
+            for doc, chunk_id in zip(partition_docs, ids):
+                if chunk_id not in existing_ids:
+                    new_docs.append(doc)
+                    new_ids.append(chunk_id)
+                    new_partitions.append(name)
+
+        total = sum(len(ids) for ids in candidate_ids.values())
+        print(f"🧩 {total} chunks in {len(partitions)} partition(s): "
+              f"{total - len(new_docs)} already stored, {len(new_docs)} new")
+
+        texts = [doc.page_content.strip() for doc in new_docs]
+        vectors, errors = await self.embedder.embed_documents(texts)
+        for i, error in sorted(errors.items()):
+            source = new_docs[i].metadata.get("source", "document")
+            failed_sources.add(source)
+            print(f"❌ Embedding error for {source} (#{i}): {error}")
+
+        if new_docs and len(errors) == len(new_docs):
+            print("❌ No valid embeddings were created.")
+            return False
+
         try:
-            collection.add(
-                documents=[doc.page_content for doc in valid_docs],
-                embeddings=embeddings,
-                metadatas=[self.sanitize_metadata(doc.metadata) for doc in valid_docs],
-                ids=[f"doc_{i}" for i in range(len(valid_docs))],
-            )
-            print("📥 Successfully added to collection.")
-            print("🧮 Total docs in collection:", collection.count())
+            for name, collection in collections.items():
+                rows = [
+                    (doc, chunk_id, vector)
+                    for doc, chunk_id, vector, partition in zip(new_docs, new_ids, vectors, new_partitions)
+                    if partition == name and vector is not None
+                ]
+                if rows:
+                    ids = [chunk_id for _, chunk_id, _ in rows]
+                    documents = [doc.page_content for doc, _, _ in rows]
+                    metadatas = [self.sanitize_metadata(doc.metadata) for doc, _, _ in rows]
+                    collection.upsert(
+                        documents=documents,
+                        embeddings=[vector for _, _, vector in rows],
+                        metadatas=metadatas,
+                        ids=ids,
+                    )
+                    lexical_index.add(name, ids, documents, metadatas)
+                    print(f"📥 Added {len(rows)} chunk(s) to {name}")
+
+                vanished = []
+                if refreshed_sources:
+                    vanished = self.delete_vanished_chunks(
+                        collection, partitions[name], set(candidate_ids[name]),
+                        set(refreshed_sources) - failed_sources,
+                    )
+                    lexical_index.delete(name, vanished)
+                if rows or vanished:
+                    # The domain's content changed: grades cached against the old chunks are stale
+                    for domain in {doc.metadata.get("domain") for doc in partitions[name]}:
+                        grade_cache.invalidate(domain)
+                print(f"🧮 Total docs in {name}:", collection.count())
             return True
         except Exception as e:
             print(f"❌ Failed to add documents to Chroma: {e}")
             return False
 
-    def vectordb_query_filtering(self, query, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data_warehouse", vectordb_name))
-
-        vectorstore = Chroma(
-            collection_name=vectordb_name,
-            embedding_function=self.embedding_function,
-            persist_directory=base_dir
+    def query_partitions(self, vectordb_name="vectorDB", metadata_filter: dict = None):
+        """
+        Collections a query has to search. A domain filter routes to that
+        domain's partition; a domain that has not been migrated yet is still
+        served from the shared collection.
+        """
+        if VECTOR_PARTITION_MODE == "single":
+            return [vectordb_name]
+
+        domain = (metadata_filter or {}).get("domain")
+        if isinstance(domain, str):
+            name = self.partition_for(domain, vectordb_name)
+            if self.store.collection(name, vectordb_name, create=False) is not None:
+                return [name]
+            return [vectordb_name]
+
+        names = [name for name in self.store.collection_names(vectordb_name) if is_partition(name)]
+        return [vectordb_name] + sorted(names)
+
+    def similarity_search(self, query, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        """
+        Hybrid retrieval: BM25 hits from the lexical index are fused with the
+        vector hits by reciprocal rank. A short keyword query whose terms are
+        all matched strongly is answered from the lexical index alone,
+        without embedding the query.
+
+        Returns a RetrievalResult carrying the query embedding and the stored
+        chunk vectors for grading.
+        """
+        names, lexical_docs, done = self.lexical_stage(query, vectordb_name, k, metadata_filter)
+        if done:
+            return RetrievalResult(lexical_docs)
+        embedding = self.embedding_function.embed_query(query)
+        return self.vector_stage(embedding, names, lexical_docs, vectordb_name, k, metadata_filter)
+
+    async def asimilarity_search(self, query, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        """
+        `similarity_search` for async callers: the query is embedded with the
+        async client and the local index work runs in worker threads, so the
+        event loop is never blocked.
+        """
+        names, lexical_docs, done = await asyncio.to_thread(
+            self.lexical_stage, query, vectordb_name, k, metadata_filter
+        )
+        if done:
+            return RetrievalResult(lexical_docs)
+        embedding = await self.embedding_function.aembed_query(query)
+        return await asyncio.to_thread(
+            self.vector_stage, embedding, names, lexical_docs, vectordb_name, k, metadata_filter
         )
 
-        results = vectorstore.similarity_search(query, k=k, filter=metadata_filter)
-        return results
-
-    def vectordb_query_chatbot(self, query: str, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
-        base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data_warehouse", vectordb_name))
+    def lexical_stage(self, query, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        """Returns (partitions, lexical candidates, done); done means the fast path answered."""
+        names = self.query_partitions(vectordb_name, metadata_filter)
+        if RETRIEVAL_MODE == "vector":
+            return names, [], False
 
-        vectorstore = Chroma(
-            collection_name=vectordb_name,
-            embedding_function=self.embedding_function,
-            persist_directory=base_dir
+        lexical_docs, scores, coverage = self.lexical_search(
+            query, names, vectordb_name, k * HYBRID_CANDIDATES, metadata_filter
         )
+        if lexical_index.strong_match(query, scores, coverage, k):
+            lexical_index.record(fast_path=True)
+            return names, lexical_docs[:k], True
+        return names, lexical_docs, False
+
+    def vector_stage(self, embedding, names, lexical_docs, vectordb_name="vectorDB", k=3,
+                     metadata_filter: dict = None):
+        if RETRIEVAL_MODE == "vector":
+            docs = self.search_by_vector(embedding, names, vectordb_name, k, metadata_filter)
+        else:
+            lexical_index.record(fast_path=False)
+            vector_docs = self.search_by_vector(
+                embedding, names, vectordb_name, k * HYBRID_CANDIDATES, metadata_filter
+            )
+            docs = self.fuse([vector_docs, lexical_docs], k)
+        return RetrievalResult(docs, embedding, self.stored_vectors(docs, names, vectordb_name))
+
+    def stored_vectors(self, docs, names, vectordb_name="vectorDB"):
+        """
+        The vectors the store already holds for `docs`, one row per document
+        (NaN where missing), so grading needs no second embedding call.
+        """
+        groups = {}
+        for doc in docs:
+            if doc.id:
+                partition = self.partition_for(doc.metadata.get("domain"), vectordb_name)
+                groups.setdefault(partition if partition in names else vectordb_name, []).append(doc.id)
+
+        found = {}
+        for name, ids in groups.items():
+            # Chunks ingested before partitioning may still sit in the shared collection
+            for source in dict.fromkeys((name, vectordb_name)):
+                missing = [chunk_id for chunk_id in ids if chunk_id not in found]
+                collection = self.store.collection(source, vectordb_name, create=False) if missing else None
+                if collection is not None:
+                    stored = collection.get(ids=missing, include=["embeddings"])
+                    found.update(zip(stored["ids"], stored["embeddings"]))
+        if not found:
+            return None
+
+        width = min(len(vector) for vector in found.values())
+        vectors = np.full((len(docs), width), np.nan, dtype=np.float32)
+        for row, doc in enumerate(docs):
+            if doc.id in found:
+                vectors[row] = truncate_dimensions(found[doc.id], width)
+        return vectors
+
+    def fuse(self, rankings, k):
+        by_key = {}
+        keys = []
+        for ranking in rankings:
+            ranked = []
+            for doc in ranking:
+                key = doc.id or doc.page_content
+                by_key.setdefault(key, doc)
+                ranked.append(key)
+            keys.append(ranked)
+        return [by_key[key] for key in reciprocal_rank_fusion(keys)[:k]]
+
+    def lexical_search(self, query, names, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        """Returns (documents, scores, coverage) for the best BM25 hits across `names`."""
+        domain = (metadata_filter or {}).get("domain")
+        domain = domain if isinstance(domain, str) else None
+
+        hits, coverage, best = [], 0.0, float("-inf")
+        for name in names:
+            partition_hits, partition_coverage = lexical_index.search(name, query, k=k, domain=domain)
+            if partition_hits and partition_hits[0][1] > best:
+                best, coverage = partition_hits[0][1], partition_coverage
+            hits.extend((name, chunk_id, score) for chunk_id, score in partition_hits)
+        hits.sort(key=lambda hit: hit[2], reverse=True)
+        hits = hits[:k]
+
+        docs = []
+        for name in dict.fromkeys(name for name, _, _ in hits):
+            collection = self.store.collection(name, vectordb_name, create=False)
+            if collection is None:
+                continue
+            ids = [chunk_id for hit_name, chunk_id, _ in hits if hit_name == name]
+            stored = collection.get(ids=ids, include=["documents", "metadatas"])
+            found = {
+                chunk_id: Document(id=chunk_id, page_content=document, metadata=metadata or {})
+                for chunk_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+            }
+            for hit_name, chunk_id, score in hits:
+                if hit_name == name and chunk_id in found and matches(found[chunk_id].metadata, metadata_filter):
+                    docs.append((score, found[chunk_id]))
+
+        docs.sort(key=lambda pair: pair[0], reverse=True)
+        return [doc for _, doc in docs], [(doc.id, score) for score, doc in docs], coverage
+
+    def search_by_vector(self, embedding, names, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        """Local top-k over `names` for an already embedded query."""
+        if self.store is exact_store:
+            return self.exact_search(embedding, names, vectordb_name, k, metadata_filter)
+
+        scored = []
+        for name in names:
+            vectorstore = store_registry.vectorstore(self.embedding_function, name, vectordb_name)
+            scored.extend(vectorstore.similarity_search_by_vector_with_relevance_scores(
+                embedding, k=k, filter=metadata_filter
+            ))
+        scored.sort(key=lambda pair: pair[1])
+        return [doc for doc, _ in scored[:k]]
+
+    def exact_search(self, embedding, names, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        """Top-k by cosine similarity over the memory-mapped partitions in `names`."""
+        scored = []
+        for name in names:
+            partition = exact_store.collection(name, vectordb_name, create=False)
+            if partition is not None:
+                scored.extend(partition.search(embedding, k=k, where=metadata_filter))
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return [doc for doc, _ in scored[:k]]
 
-        results = vectorstore.similarity_search(query, k=k, filter=metadata_filter)
+    def vectordb_query_filtering(self, query, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        return self.similarity_search(query, vectordb_name, k, metadata_filter)
 
-        return results
+    def vectordb_query_chatbot(self, query: str, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        return self.similarity_search(query, vectordb_name, k, metadata_filter)
+
+    async def avectordb_query_filtering(self, query, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        return await self.asimilarity_search(query, vectordb_name, k, metadata_filter)
 
+    async def avectordb_query_chatbot(self, query: str, vectordb_name="vectorDB", k=3, metadata_filter: dict = None):
+        return await self.asimilarity_search(query, vectordb_name, k, metadata_filter)
 
     async def proto_add_final(self, company_name):
         chunker = ScraperManager()
         data = await chunker.chunking(company_name)
-        success = await self.vectordb_add(data)
+
+        if not data and chunker.unchanged_sources:
+            print("♻️ Policies unchanged since the last scrape, skipping embedding")
+            return True
+
+        failed_sources = set()
+        success = await self.vectordb_add(
+            data, refreshed_sources=chunker.refreshed_sources, failed_sources=failed_sources
+        )
+        if success:
+            # Sources with failed embeddings are re-fetched next time
+            chunker.commit_fetch_records(skip_sources=failed_sources)
 
         return success
 
 
+_shared_manager = None
+_shared_lock = threading.Lock()
+
+
+def get_vector_store_manager():
+    """Process-wide VectorStoreManager; it holds no per-request state."""
+    global _shared_manager
+    with _shared_lock:
+        if _shared_manager is None:
+            _shared_manager = VectorStoreManager()
+        return _shared_manager
+
 
 if __name__ == "__main__":
     test = VectorStoreManager()
@@ -1,37 +1,58 @@
 # links
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlparse
+from collections import OrderedDict, defaultdict
+import asyncio
+import os
+import time
 
 # Scaper imports
-from bs4 import BeautifulSoup
-from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
-from langchain_core.prompts import ChatPromptTemplate
-from datetime import datetime, timezone
-import requests
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+import httpx
 
 #LANGCHAIN
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.output_parsers import JsonOutputParser
 from langchain_google_vertexai import ChatVertexAI
 
 
 from backend.auth.init_vertex import init_vertex_ai
 from backend.src.tools.datatracker import add_company
-
-
-def extract_main_text(html: str) -> str:
-    soup = BeautifulSoup(html, "html.parser")
-
-    for tag in soup(["script", "style", "noscript", "header", "footer", "svg", "meta", "nav", "aside", "form"]):
-        tag.decompose()
-
-    container = soup.find("main") or soup.find("article") or soup.body
-    if not container:
-        return ""
-
-    # 🔧 FIX: Loosen or remove this filter
-    lines = container.get_text(separator="\n").splitlines()
-    lines = [line.strip() for line in lines if len(line.strip()) > 5]  # Changed from 30 to 5
-    return "\n".join(lines)
+from backend.src.tools.browser_pool import browser_pool
+from backend.src.tools.bot_detection import detect_bot_verdict
+from backend.src.tools.request_filter import intercept_requests
+from backend.src.tools.http_client import http_client
+from backend.src.tools.text_extraction import extract_main_text_async
+from backend.src.tools.enrichment import MetadataEnricher
+from backend.src.tools.page_fetcher import (
+    TIER_RENDERED, TIER_STATIC, content_sufficient, fetch_records, normalized_text_hash, tier_memory
+)
+
+# Policy page fetch limits (per company run)
+SCRAPE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "4"))
+SCRAPE_PER_HOST_CONCURRENCY = int(os.getenv("SCRAPE_PER_HOST_CONCURRENCY", "2"))
+SCRAPE_BUDGET_SECONDS = float(os.getenv("SCRAPE_BUDGET_SECONDS", "60"))
+
+# Brute-force policy path probing
+BRUTEFORCE_PATHS = [
+    "privacy", "privacy-policy", "legal/privacy", "terms",
+    "terms-of-service", "cookie-policy", "policies",
+    "legal", "legal/terms", "privacy.html", "terms.html"
+]
+PROBE_ENOUGH_CANDIDATES = int(os.getenv("PROBE_ENOUGH_CANDIDATES", "3"))
+PROBE_TIMEOUT_SECONDS = 5
+PROBE_NEGATIVE_TTL_SECONDS = int(os.getenv("PROBE_NEGATIVE_TTL_SECONDS", str(6 * 3600)))
+PROBE_NEGATIVE_MAX_HOSTS = int(os.getenv("PROBE_NEGATIVE_MAX_HOSTS", "10000"))
+
+# host -> {path: monotonic time until which the path is known missing}, least recently probed host first
+_negative_probes = OrderedDict()
+
+
+def negative_probes(host, now):
+    """The host's unexpired missing paths; marks it recently probed and evicts the oldest hosts."""
+    misses = {path: until for path, until in _negative_probes.pop(host, {}).items() if until > now}
+    _negative_probes[host] = misses
+    while len(_negative_probes) > PROBE_NEGATIVE_MAX_HOSTS:
+        _negative_probes.popitem(last=False)
+    return misses
 
 
 class ScraperManager:
@@ -43,114 +64,39 @@ class ScraperManager:
             temperature=0.8,
             max_output_tokens=8000
         )
+        self.unchanged_sources = []
+        self.refreshed_sources = []
+        self.pending_fetch_records = []
+
+    def commit_fetch_records(self, skip_sources=()):
+        """Persist fetch records once the scraped pages have been ingested."""
+        for record in self.pending_fetch_records:
+            if record["url"] not in skip_sources:
+                fetch_records.save(record)
+        self.pending_fetch_records = []
 
     async def detect_bot_verification(self, page):
         """
         Detect if the current page is a bot verification/CAPTCHA page
         Returns True if bot verification is detected, False otherwise
         """
-        try:
-            # Check page title for common bot detection indicators
-            title = await page.title()
-            title_lower = title.lower()
-
-            bot_title_keywords = [
-                "verify", "captcha", "robot", "human", "security check",
-                "access denied", "blocked", "cloudflare", "just a moment",
-                "checking your browser", "ddos protection", "rate limit"
-            ]
-
-            if any(keyword in title_lower for keyword in bot_title_keywords):
-                print(f"🤖 Bot verification detected in title: {title}")
-                return True
-
-            # Check for common bot detection elements
-            bot_selectors = [
-                # Cloudflare
-                ".cf-browser-verification",
-                "#cf-wrapper",
-                ".cf-checking-browser",
-
-                # Generic CAPTCHA
-                "[data-callback*='captcha']",
-                ".g-recaptcha",
-                ".h-captcha",
-                ".captcha",
-
-                # Access denied pages
-                ".access-denied",
-                ".blocked",
-
-                # Rate limiting
-                ".rate-limit",
-                ".too-many-requests",
-
-                # Security checks
-                ".security-check",
-                ".verification-required"
-            ]
-
-            for selector in bot_selectors:
-                element = await page.query_selector(selector)
-                if element:
-                    print(f"🤖 Bot verification detected by selector: {selector}")
-                    return True
-
-            # Check page content for bot detection text
-            page_content = await page.content()
-            content_lower = page_content.lower()
-
-            bot_text_indicators = [
-                "verify you are human",
-                "complete the captcha",
-                "security check",
-                "checking your browser",
-                "just a moment",
-                "ddos protection",
-                "cloudflare",
-                "access denied",
-                "rate limited",
-                "too many requests",
-                "suspicious activity"
-            ]
-
-            for indicator in bot_text_indicators:
-                if indicator in content_lower:
-                    print(f"🤖 Bot verification detected by text: '{indicator}'")
-                    return True
-
-            # Check for redirect to verification pages
-            current_url = page.url
-            verification_url_patterns = [
-                "captcha", "verify", "security", "blocked", "denied",
-                "cloudflare", "ddos", "rate-limit"
-            ]
-
-            if any(pattern in current_url.lower() for pattern in verification_url_patterns):
-                print(f"🤖 Bot verification detected in URL: {current_url}")
-                return True
-
-            return False
+        verdict = await detect_bot_verdict(page)
 
-        except Exception as e:
-            print(f"⚠️ Error during bot detection: {e}")
-            return False
+        if verdict.error:
+            print(f"⚠️ Error during bot detection: {verdict.error}")
+        elif verdict.detected:
+            print(f"🤖 Bot verification detected by {verdict.kind}: {verdict.detail or verdict.signal}")
 
-    async def extract_footer_links_async(self, url: str):
-        async with async_playwright() as p:
+        return verdict.detected
 
-            browser = await p.chromium.launch(
-                headless=True,
-                args=["--no-sandbox", "--disable-dev-shm-usage"]
-            )
-            page = await browser.new_page()
+    async def extract_footer_links_async(self, url: str):
+        async with browser_pool.page() as page, intercept_requests(page) as traffic:
 
             try:
                 await page.goto(url, timeout=60000)
             except Exception as e:
                 print(f"❌ Failed to load {url}: {e}")
                 add_company(url, False,"❌ Failed to load {url}: {e}")
-                await browser.close()
                 return [{
                 "text": f"❌ Failed to load {url}: {e}",
                 "href": url
@@ -161,8 +107,6 @@ class ScraperManager:
                 print(f"🚫 Skipping {url} - Bot verification detected")
 
                 add_company(url,False,"Skipping {url} - Bot verification detected")
-                print("WHat the fuck is wrong ")
-                await browser.close()
 
                 return [{
                     "text": f"🚫 Skipping {url} - Bot verification detected",
@@ -187,84 +131,223 @@ class ScraperManager:
                         "href": full_url
                     })
 
+        print(f"🧹 Request filter for {url}: {traffic.summary()}")
 
-            bruteforce_paths = [
-                "privacy", "privacy-policy", "legal/privacy", "terms",
-                "terms-of-service", "cookie-policy", "policies",
-                "legal", "legal/terms", "privacy.html", "terms.html"
-            ]
-
-            if len(policy_links) == 0:
-                for link in bruteforce_paths:
-                    url_valid = urljoin(url, link)
-                    try:
-                        response = requests.get(url_valid, timeout=5)
-                        if response.status_code == 200:
-                            print("URL is reachable.")
-                            policy_links.append({
-                        "text": link,
-                        "href": url_valid
-                    })
-                        else:
-                            print(f"URL returned status code: {response.status_code}")
-                    except requests.exceptions.RequestException as e:
-                        (
-                            print(f"URL is not reachable. Error: {e}"))
-
-            await browser.close()
+        if len(policy_links) == 0:
+            policy_links = await self.probe_policy_paths(url)
 
         return policy_links
 
-    async def extract_fully_rendered_page(self, url: str) -> str:
-        try:
-            # First attempt: Use Playwright for dynamic content
-            async with async_playwright() as p:
-                browser = await p.chromium.launch(headless=True, args=["--no-sandbox"])
-                page = await browser.new_page()
-
-                try:
-                    await page.goto(url, timeout=20000, wait_until="networkidle")
-                    html = await page.content()
-                    print("✅ Playwright succeeded, so this is not the issue")
-                    return extract_main_text(html)
-
-                finally:
-                    await browser.close()
+    async def probe_policy_paths(self, url: str, paths=BRUTEFORCE_PATHS, enough=PROBE_ENOUGH_CANDIDATES):
+        """
+        Guess common policy paths on the shared HTTP client.
+        Sends HEAD (falling back to GET) probes concurrently, stops once `enough`
+        candidates answer 200 and remembers per host which paths were missing.
+        """
+        host = urlparse(url).netloc
+        now = time.monotonic()
+        misses = negative_probes(host, now)
+        todo = [path for path in paths if path not in misses]
+        found = set()
+
+        if not todo:
+            print(f"All policy paths for {host} are cached as missing")
+            return []
 
-        except PlaywrightTimeout:
-            print("⚠️ Timeout in Playwright, falling back to BeautifulSoup...")
+        async with http_client.session() as client:
 
-        except Exception as e:
-            print(f"⚠️ Playwright failed due to {e}, falling back to BeautifulSoup...")
+            async def probe(path):
+                url_valid = urljoin(url, path)
+                try:
+                    response = await client.head(url_valid, timeout=PROBE_TIMEOUT_SECONDS)
+                    if response.status_code in (403, 405, 501):
+                        # Some servers refuse HEAD but serve GET fine
+                        response = await client.get(url_valid, timeout=PROBE_TIMEOUT_SECONDS)
+                except httpx.HTTPError as e:
+                    print(f"URL is not reachable. Error: {e}")
+                    return path, False
+
+                # Soft 404s usually redirect back to the home page
+                landed_home = str(response.url).rstrip("/") == url.rstrip("/")
+                if response.status_code == 200 and not landed_home:
+                    print(f"URL is reachable: {url_valid}")
+                    return path, True
+
+                print(f"URL returned status code: {response.status_code}")
+                if 400 <= response.status_code < 500 or landed_home:
+                    misses[path] = time.monotonic() + PROBE_NEGATIVE_TTL_SECONDS
+                return path, False
+
+            tasks = [asyncio.create_task(probe(path)) for path in todo]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    path, ok = await next_done
+                    if ok:
+                        found.add(path)
+                        if len(found) >= enough:
+                            break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+        return [{"text": path, "href": urljoin(url, path)} for path in paths if path in found]
+
+    async def fetch_static(self, url: str, previous=None):
+        """
+        Plain HTTP fetch on the shared client, conditional when a previous
+        fetch record is known. Returns the response (200 or 304) or None.
+        """
+        headers = {}
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
 
-        # Fallback: Use requests + BeautifulSoup (static HTML only)
         try:
-            response = requests.get(url, timeout=10)
+            async with http_client.session() as client:
+                response = await client.get(url, headers=headers)
+            if response.status_code == 304:
+                return response
             response.raise_for_status()
-            print("✅ Fallback using BeautifulSoup succeeded")
-            return extract_main_text(response.text)
-
+            return response
         except Exception as e:
-            print(f"❌ Both methods failed: {e}")
-            return ""
-
-    async def process_company_policies(self,company_url):
-        footer_links = await self.extract_footer_links_async(company_url)
-        policies_list = []
+            print(f"⚠️ Static fetch failed for {url}: {e}")
+            return None
 
+    async def fetch_rendered(self, url: str):
+        """Headless browser fetch on a pooled page. Returns the rendered HTML or None."""
+        try:
+            async with browser_pool.page() as page, intercept_requests(page) as traffic:
+                await page.goto(url, timeout=20000, wait_until="networkidle")
+                html = await page.content()
+            print(f"🧹 Request filter for {url}: {traffic.summary()}")
+            return html
+        except PlaywrightTimeout:
+            print(f"⚠️ Timeout in Playwright for {url}")
+        except Exception as e:
+            print(f"⚠️ Playwright failed due to {e}")
+        return None
+
+    def page_result(self, url, text, previous=None, response=None, company=None):
+        record = None
+        if text:
+            record = {
+                "company": company,
+                "url": url,
+                "etag": response.headers.get("etag") if response is not None else None,
+                "last_modified": response.headers.get("last-modified") if response is not None else None,
+                "content_hash": normalized_text_hash(text),
+            }
+        unchanged = bool(previous and record and previous["content_hash"] == record["content_hash"])
+        return {"content": text, "unchanged": unchanged, "record": record}
+
+    async def fetch_page(self, url: str, previous=None, company=None) -> dict:
+        """
+        Tiered fetch: plain HTTP first, and the headless browser only when the
+        static text fails the sufficiency check or the domain is known to need it.
 
-        for link in footer_links:
-            href = link["href"]
+        With a `previous` fetch record the static tier is a conditional GET and
+        the result is flagged `unchanged` on a 304 or an identical text hash.
+        The new record is for `company`. Returns {"content", "unchanged", "record"}.
+        """
+        host = urlparse(url).netloc
+        static_tried = False
+        static_text = ""
+        response = None
+
+        if tier_memory.get(host) != TIER_RENDERED:
+            static_tried = True
+            response = await self.fetch_static(url, previous)
+            if response is not None and response.status_code == 304:
+                print(f"♻️ {url} not modified since the last scrape")
+                return {"content": "", "unchanged": True, "record": previous}
+            if response is not None:
+                html = response.text
+                static_text = await extract_main_text_async(html)
+                sufficient, reason = content_sufficient(html, static_text)
+                if sufficient:
+                    print(f"✅ Static fetch sufficient for {url}")
+                    tier_memory.record(host, TIER_STATIC)
+                    return self.page_result(url, static_text, previous, response, company)
+                print(f"↗️ Escalating {url} to the browser: {reason}")
+
+        html = await self.fetch_rendered(url)
+        if html is not None:
+            text = await extract_main_text_async(html)
+            if len(text) > len(static_text):
+                print(f"✅ Rendered fetch succeeded for {url}")
+                tier_memory.record(host, TIER_RENDERED)
+                return self.page_result(url, text, previous, company=company)
+            # Rendering added nothing, so this domain doesn't need it
+            tier_memory.record(host, TIER_STATIC)
+            return self.page_result(url, static_text, previous, response, company)
+
+        if not static_tried:
+            response = await self.fetch_static(url)
+            if response is not None:
+                text = await extract_main_text_async(response.text)
+                return self.page_result(url, text, previous, response, company)
+
+        if not static_text:
+            print(f"❌ Both methods failed for {url}")
+        return self.page_result(url, static_text, previous, response, company)
 
-            print(f"extracting from {link}")
-            page_content = await self.extract_fully_rendered_page(href)
+    async def extract_fully_rendered_page(self, url: str) -> str:
+        page = await self.fetch_page(url)
+        return page["content"]
 
-            metadata = href
+    async def fetch_policy_pages(self, links, company_url, max_concurrency=SCRAPE_MAX_CONCURRENCY,
+                                 per_host=SCRAPE_PER_HOST_CONCURRENCY, budget=SCRAPE_BUDGET_SECONDS):
+        """
+        Fetch `company_url`'s policy pages concurrently, capped globally and
+        per host, against that company's fetch records.
+        Pages still running when the time budget runs out are cancelled and
+        left out, so callers get partial results in the original link order.
+        """
+        global_slots = asyncio.Semaphore(max_concurrency)
+        host_slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+
+        async def fetch(href):
+            host = urlparse(href).netloc
+            async with global_slots, host_slots[host]:
+                print(f"extracting from {href}")
+                return await self.fetch_page(href, fetch_records.get(company_url, href), company_url)
+
+        # Footers often repeat the same link; fetch each page once
+        hrefs = list(dict.fromkeys(link["href"] for link in links))
+        if not hrefs:
+            return []
 
-            policies_list.append({
-                "content": page_content,
-                "metadata": metadata
+        tasks = [asyncio.create_task(fetch(href)) for href in hrefs]
+        done, pending = await asyncio.wait(tasks, timeout=budget)
+
+        if pending:
+            print(f"⏱️ Scrape budget of {budget}s exhausted, dropping {len(pending)} unfinished page(s)")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        pages = []
+        for href, task in zip(hrefs, tasks):
+            if task not in done:
+                continue
+            if task.exception():
+                print(f"❌ Failed to extract {href}: {task.exception()}")
+                continue
+            page = task.result()
+            pages.append({
+                "content": page["content"],
+                "metadata": href,
+                "unchanged": page["unchanged"],
+                "fetch_record": page["record"]
             })
+        return pages
+
+    async def process_company_policies(self,company_url):
+        footer_links = await self.extract_footer_links_async(company_url)
+        policies_list = await self.fetch_policy_pages(footer_links, company_url)
         print("done")
         return policies_list
 
@@ -272,6 +355,17 @@ class ScraperManager:
         print("🧪 Chunking the data!")
         pages = await self.process_company_policies(company_url)
 
+        # Unchanged pages are already in the vector store; only re-chunk the rest
+        self.unchanged_sources = [page["metadata"] for page in pages if page.get("unchanged")]
+        pages = [page for page in pages if not page.get("unchanged")]
+        self.pending_fetch_records = [page["fetch_record"] for page in pages if page.get("fetch_record")]
+
+        if self.unchanged_sources:
+            print(f"♻️ {len(self.unchanged_sources)} page(s) unchanged since the last scrape")
+            if not pages:
+                print("Nothing changed. Skipping chunking.")
+                return []
+
         print(f"Pages scraped: {len(pages)}")
         for idx, page in enumerate(pages):
             print(f"📄 Page {idx} content length: {len(page['content'])}")
@@ -284,7 +378,8 @@ class ScraperManager:
         )
 
         main_data = [page["content"] for page in pages]
-        metadata_tag = [{"source": page["metadata"]} for page in pages]
+        metadata_tag = [{"source": page["metadata"], "domain": company_url} for page in pages]
+        self.refreshed_sources = [page["metadata"] for page in pages if page["content"]]
 
         # Check if content exists
         if not any(main_data):
@@ -305,52 +400,8 @@ class ScraperManager:
 
         print("Generating the metadata tags with Gemini...")
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system",
-             '''You are a policy analyzer that generates structured metadata for pre-chunked legal content (e.g., Terms of Service, Privacy Policies). Your output will be used for semantic retrieval, privacy risk detection, and clause-level reasoning in downstream AI applications.'''),
-            ("human", '''Given the following policy text, generate a **JSON object** that includes structured metadata fields.
-
-    Use this schema (remove any fields with None values):
-    - "domain": {url}.
-    - "scrape_date": {timestamp}
-    - "language": Detected language (e.g., "en").
-    - "policy_type": One of: "privacy_policy", "terms_of_service", "cookie_policy", "acceptable_use", "other"
-    - "risk_tags": comma-separated privacy/legal risks (e.g., "data_sharing, location_tracking")
-    - "section_title": Descriptive title for this chunk (infer if not present)
-    - "summary": A 1–2 sentence plain-English summary
-    - "categories": comma-separated topics (e.g., "data_collection", "user_rights")
-    - "user_impact_level": One of "low", "medium", "high" based on user impact
-
-    Return only one valid JSON object. No markdown, no explanation.
-
-    Policy Text:
-    """
-    {data}
-    """''')
-        ])
-
-        import asyncio
-        semaphore = asyncio.Semaphore(15)
-
-        async def enrich_metadata_async(chunk, company_url):
-            async with semaphore:
-                timestamp = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-                base_chain = prompt | self.llm | JsonOutputParser()
-                try:
-                    response = await base_chain.ainvoke({
-                        "data": chunk.page_content,
-                        "url": company_url,
-                        "timestamp": timestamp
-                    })
-                    chunk.metadata = chunk.metadata | response
-                except Exception as e:
-                    print(f"❌ Metadata generation failed for chunk: {e}")
-
-        async def enrich_all_chunks(chunks, company_url):
-            tasks = [enrich_metadata_async(chunk, company_url) for chunk in chunks]
-            await asyncio.gather(*tasks)
-
-        await enrich_all_chunks(chunks, company_url)
+        enricher = MetadataEnricher(self.llm)
+        await enricher.enrich(chunks, company_url)
 
         # Mark success
         add_company(company_url, True)
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from collections import deque
+
+GOVERNOR_INITIAL_LIMIT = int(os.getenv("GOVERNOR_INITIAL_LIMIT", "8"))
+GOVERNOR_MIN_LIMIT = int(os.getenv("GOVERNOR_MIN_LIMIT", "1"))
+GOVERNOR_MAX_LIMIT = int(os.getenv("GOVERNOR_MAX_LIMIT", "32"))
+GOVERNOR_MAX_RETRIES = int(os.getenv("GOVERNOR_MAX_RETRIES", "5"))
+GOVERNOR_BACKOFF_BASE = float(os.getenv("GOVERNOR_BACKOFF_BASE", "1.0"))
+GOVERNOR_BACKOFF_CAP = float(os.getenv("GOVERNOR_BACKOFF_CAP", "30.0"))
+# Multiplicative decrease applied to the limit on a quota error
+GOVERNOR_DECREASE = 0.5
+THROUGHPUT_WINDOW_SECONDS = 60
+
+THROTTLE_MARKERS = ("429", "resource_exhausted", "resourceexhausted", "quota", "too many requests", "rate limit")
+TRANSIENT_MARKERS = ("503", "unavailable", "deadline", "timed out", "timeout")
+
+
+def is_throttle_error(error: Exception) -> bool:
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in THROTTLE_MARKERS)
+
+
+def is_retryable(error: Exception) -> bool:
+    if is_throttle_error(error):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in TRANSIENT_MARKERS)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(GOVERNOR_BACKOFF_CAP, GOVERNOR_BACKOFF_BASE * 2 ** attempt))
+
+
+def model_name(model) -> str:
+    if isinstance(model, str):
+        return model
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+class AIMDLimiter:
+    """
+    Adaptive concurrency limit for one model/endpoint.
+
+    Additive increase after successes, multiplicative decrease on quota
+    errors. Usable from threads and from any event loop: async waiters are
+    woken on their own loop.
+    """
+
+    def __init__(self, name, initial=GOVERNOR_INITIAL_LIMIT, min_limit=GOVERNOR_MIN_LIMIT,
+                 max_limit=GOVERNOR_MAX_LIMIT):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+
+        self._lock = threading.Lock()
+        self._waiters = deque()
+        self.in_flight = 0
+        self.completed = 0
+        self.throttled = 0
+        self.errors = 0
+        self.retries = 0
+        self.failures = 0
+        self._recent = deque()
+
+    def _has_room(self):
+        return self.in_flight < int(self.limit)
+
+    def _grant_waiters(self):
+        # Called with the lock held
+        while self._waiters and self._has_room():
+            kind, waiter = self._waiters.popleft()
+            self.in_flight += 1
+            if kind == "thread":
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(self._resolve, future)
+
+    def _resolve(self, future):
+        if future.done():
+            # Waiter was cancelled after the slot was granted; hand it back
+            self._free_slot()
+        else:
+            future.set_result(None)
+
+    def _free_slot(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._grant_waiters()
+
+    def acquire(self):
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return
+            event = threading.Event()
+            self._waiters.append(("thread", event))
+        event.wait()
+
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._has_room() and not self._waiters:
+                self.in_flight += 1
+                return
+            future = loop.create_future()
+            entry = ("async", (loop, future))
+            self._waiters.append(entry)
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    raise
+            if future.done() and not future.cancelled():
+                self._free_slot()
+            raise
+
+    def release(self, outcome="success", retry=None):
+        """
+        Return a slot and adapt the limit: outcome is "success", "throttled"
+        or "error". A failed attempt counts as a retry (retry=True) or a
+        final failure (retry=False); None counts neither.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if retry is not None:
+                if retry:
+                    self.retries += 1
+                else:
+                    self.failures += 1
+            if outcome == "success":
+                self.completed += 1
+                self.limit = min(self.max_limit, self.limit + 1 / max(1.0, self.limit))
+                now = time.monotonic()
+                self._recent.append(now)
+                while self._recent and now - self._recent[0] > THROUGHPUT_WINDOW_SECONDS:
+                    self._recent.popleft()
+            elif outcome == "throttled":
+                self.throttled += 1
+                self.limit = max(self.min_limit, self.limit * GOVERNOR_DECREASE)
+            else:
+                self.errors += 1
+            self._grant_waiters()
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            recent = sum(1 for t in self._recent if now - t <= THROUGHPUT_WINDOW_SECONDS)
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": len(self._waiters),
+                "completed": self.completed,
+                "throttled": self.throttled,
+                "errors": self.errors,
+                "retries": self.retries,
+                "failures": self.failures,
+                "throughput_per_min": recent * 60 / THROUGHPUT_WINDOW_SECONDS,
+            }
+
+
+class RateGovernor:
+    """
+    Shared throttle for every Vertex call: one AIMDLimiter per model and
+    endpoint, plus retries with jittered backoff on quota and transient errors.
+
+        await governor.arun(self.llm, "generate", lambda: chain.ainvoke(inputs))
+        governor.run(self.embedding_function, "embed", lambda: emb.embed_query(q))
+    """
+
+    def __init__(self, max_retries=GOVERNOR_MAX_RETRIES):
+        self.max_retries = max_retries
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, model, endpoint):
+        key = f"{model_name(model)}:{endpoint}"
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = AIMDLimiter(key)
+            return self._limiters[key]
+
+    def _on_error(self, limiter, error, attempt):
+        """Release the slot for a failed attempt; returns the retry delay or re-raises."""
+        throttled = is_throttle_error(error)
+        retry = attempt < self.max_retries and is_retryable(error)
+        limiter.release("throttled" if throttled else "error", retry=retry)
+        if not retry:
+            raise error
+        delay = backoff_delay(attempt)
+        reason = "throttled" if throttled else "transient error"
+        print(f"⏳ {limiter.name} {reason} ({type(error).__name__}), retry {attempt + 1} in {delay:.1f}s")
+        return delay
+
+    async def arun(self, model, endpoint, fn):
+        """Run `fn()` (returning an awaitable) under the limiter for model/endpoint."""
+        limiter = self.limiter(model, endpoint)
+        attempt = 0
+        while True:
+            await limiter.acquire_async()
+            try:
+                result = await fn()
+            except asyncio.CancelledError:
+                limiter.release("error")
+                raise
+            except Exception as e:
+                delay = self._on_error(limiter, e, attempt)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            limiter.release("success")
+            return result
+
+    def run(self, model, endpoint, fn):
+        """
+        Blocking counterpart of `arun` for synchronous call sites. Refuses to
+        run on an event loop thread: waiting for a slot or a backoff there
+        would stall every request on the worker, and could deadlock on async
+        callers that need the loop to release their slots.
+        """
+        limiter = self.limiter(model, endpoint)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                f"governor.run would block the event loop ({limiter.name}); "
+                "use governor.arun or asyncio.to_thread"
+            )
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._on_error(limiter, e, attempt)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            limiter.release("success")
+            return result
+
+    def stats(self):
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.stats() for key, limiter in limiters.items()}
+
+
+governor = RateGovernor()
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+import threading
+
+DATA_WAREHOUSE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "data_warehouse")
+)
+
+
+def data_warehouse_path(*parts):
+    """Absolute path inside backend/src/data_warehouse."""
+    return os.path.join(DATA_WAREHOUSE_DIR, *parts)
+
+
+class SQLiteStore:
+    """
+    Small base for the local caches under data_warehouse/cache.
+
+    One connection per store, shared across threads behind a lock; the
+    subclass creates its tables in `setup`.
+    """
+
+    def __init__(self, filename, path=None):
+        self.path = path or data_warehouse_path("cache", filename)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.lock, self.conn:
+            self.setup(self.conn)
+
+    def setup(self, conn):
+        pass
+
+    def close(self):
+        with self.lock:
+            self.conn.close()